@@ -1,4 +1,19 @@
+import sys
+
 from .router import Router
 from .router import Route
+from .router import TreeRouter
+from .router import CompiledRouter
 from .publisher import Publisher
-from .app import Application
+
+# the application (and WebOb) is imported on first use
+if sys.version_info >= (3, 7):
+    def __getattr__(name):
+        if name == 'Application':
+            from .app import Application
+            globals()[name] = Application
+            return Application
+        raise AttributeError(
+            "module %r has no attribute %r" % (__name__, name))
+else: # pragma no cover
+    from .app import Application
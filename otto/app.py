@@ -1,11 +1,21 @@
 import types
 
 from webob import Request
+from webob import Response
 from webob.exc import HTTPError
 from webob.exc import HTTPException
 from webob.exc import HTTPNotFound
+from webob.exc import HTTPMethodNotAllowed
 from webob.exc import HTTPMovedPermanently
+from otto.cache import LRUCache
+from otto.publisher import MethodNotAllowed
 from otto.publisher import Publisher
+from otto.metrics import timer
+from otto.utils import host_name
+from otto.utils import path_info
+
+# rendered 404 pages by accept header
+_not_found = LRUCache(32)
 
 class Application(Publisher):
     """WSGI-Application.
@@ -13,6 +23,16 @@ class Application(Publisher):
     This class adds a WSGI application interface to the HTTP
     publisher. The ``publish`` method can be overriden to intercept
     errors (the HTTP exception classes are provided by :mod:`WebOb`).
+
+    When the match cache is enabled, the ``404 Not Found`` response is
+    rendered only once for each kind of ``Accept`` header.
+
+    If a metrics registry is given, each request is recorded (see
+    :mod:`otto.metrics`).
+
+    The request object is created only when a controller is called;
+    controllers decorated with :func:`takes_environ` are passed the
+    WSGI environment instead.
     """
 
     def __call__(self, environ, start_response):
@@ -27,31 +47,146 @@ class Application(Publisher):
             return response(environ, start_response)
         return wsgi_app
 
+    def __init__(self, mapper=None, router=None, cache=None, metrics=None,
+                 lazy=False):
+        """See :class:`Publisher`; the optional ``metrics`` argument is
+        a :class:`otto.metrics.Metrics` registry which records the
+        requests."""
+
+        super(Application, self).__init__(mapper, router, cache, lazy)
+        self._metrics = metrics
+
+    def _discard(self, routes):
+        if self._metrics is not None:
+            for route in routes:
+                self._metrics.discard(route)
+        super(Application, self)._discard(routes)
+
     def publish(self, environ, bind=None):
         """Return response for request given by ``environ``."""
 
-        request = Request(environ)
-        path = request.path_info
-        controller = self.match(path)
-        if controller is None:
-            if path.endswith('/'):
-                path = path.rstrip('/')
-            else:
-                path = path + '/'
-            controller = self.match(path)
-            if controller is not None:
-                request.path_info = path
-                response = HTTPMovedPermanently(location=request.url)
-            else:
-                response = HTTPNotFound("Page not found.")
-        else:
-            if bind is not None:
-                controller = types.MethodType(controller, bind)
+        metrics = self._metrics
+        if metrics is not None:
+            started = timer()
+
+        publisher = self
+        if self._hosts is not None:
+            publisher = self.select(host_name(environ))
+
+        match, redirect = publisher.lookup(path_info(environ))
+        if match is None:
+            if metrics is not None:
+                metrics.miss(redirect)
+            return self.miss(environ, redirect)
+
+        if metrics is None:
+            return self._respond(publisher, match, environ, bind)
+
+        # ``_respond`` appends the time at which the controller has
+        # been dispatched (if it's called)
+        timings = [timer()]
+        status = 500
+        try:
+            response = self._respond(
+                publisher, match, environ, bind, timings)
+            status = getattr(response, 'status_int', 0)
+        finally:
+            matched, dispatched = timings[0], timings[-1]
+            metrics.route(match.route).record(
+                matched - started, dispatched - matched,
+                timer() - dispatched, status)
+        return response
+
+    def _respond(self, publisher, match, environ, bind, timings=None):
+        # return response for a route match; a cached response is
+        # returned without dispatching
+        responses = match.route._responses
+        key = None
+        if responses is not None:
+            key = responses.key(match.dict, environ)
+            if key is not None:
+                response = responses.get(key)
+                if response is not None:
+                    return response.conditional(environ)
+
+        try:
             try:
-                response = controller(request)
-            except HTTPError as e:
-                response = e
-            except HTTPException as e:  # pragma no cover
-                response = e.wsgi_response
+                controller = match.route.dispatch(
+                    match.dict, environ.get('REQUEST_METHOD', 'GET'))
+            except MethodNotAllowed as e:
+                return method_not_allowed(environ, e.allow)
+            if timings is not None:
+                timings.append(timer())
+            response = self.call(controller, environ, bind)
+        finally:
+            for mapper in publisher._scoped:
+                mapper.clear()
 
+        if key is not None:
+            return responses.store(key, response, environ)
         return response
+
+    def call(self, controller, environ, bind=None):
+        """Return response from ``controller``."""
+
+        if getattr(controller.func, 'takes_environ', False):
+            request = environ
+        else:
+            request = Request(environ)
+        if bind is not None:
+            controller = types.MethodType(controller, bind)
+        try:
+            return controller(request)
+        except HTTPError as e:
+            return e
+        except HTTPException as e:  # pragma no cover
+            return e.wsgi_response
+
+    def miss(self, environ, redirect):
+        """Return response for a request which didn't match a route;
+        if ``redirect`` is given, it's a redirect to this path."""
+
+        if redirect is not None:
+            request = Request(dict(environ))
+            request.path_info = redirect
+            return HTTPMovedPermanently(location=request.url)
+        elif self._cache is not None:
+            return not_found(environ)
+        return HTTPNotFound("Page not found.")
+
+def takes_environ(controller):
+    """Mark ``controller`` as taking the WSGI environment in place of
+    the request object. Example::
+
+      @app.connect('/health')
+      @takes_environ
+      def health(environ):
+          return Response('OK')
+    """
+
+    controller.takes_environ = True
+    return controller
+
+def method_not_allowed(environ, allow):
+    """Return ``405 Method Not Allowed`` response; for an ``OPTIONS``
+    request, return an empty response with the ``Allow`` header."""
+
+    if environ.get('REQUEST_METHOD') == 'OPTIONS':
+        return Response(
+            status=200, headerlist=[
+                ('Allow', allow), ('Content-Length', '0')])
+    return HTTPMethodNotAllowed(headers=[('Allow', allow)])
+
+def not_found(environ):
+    """Return pre-rendered ``404 Not Found`` response."""
+
+    accept = environ.get('HTTP_ACCEPT', '')
+    rendered = _not_found.get(accept)
+    if rendered is None:
+        request = Request({'REQUEST_METHOD': 'GET', 'HTTP_ACCEPT': accept})
+        response = request.get_response(HTTPNotFound("Page not found."))
+        rendered = response.status, response.headerlist, response.body
+        _not_found[accept] = rendered
+
+    status, headerlist, body = rendered
+    return Response(body=body, status=status, headerlist=list(headerlist))
@@ -0,0 +1,310 @@
+"""ASGI application (requires Python 3.5 or later).
+
+Controllers and mappers may be coroutines. Plain controllers are run
+in a bounded thread pool such that they don't block the event loop.
+"""
+
+import asyncio
+import inspect
+import io
+import sys
+
+try:
+    from contextvars import copy_context
+except ImportError: # pragma no cover
+    copy_context = None
+
+try:
+    get_running_loop = asyncio.get_running_loop
+except AttributeError: # pragma no cover
+    get_running_loop = asyncio.get_event_loop
+
+from concurrent.futures import ThreadPoolExecutor
+
+from webob import Request
+from webob.exc import HTTPError
+from webob.exc import HTTPException
+from webob.exc import HTTPNotFound
+from webob.exc import HTTPMovedPermanently
+from otto.app import method_not_allowed
+from otto.app import not_found
+from otto.publisher import MethodNotAllowed
+from otto.publisher import Publisher
+from otto.router import Route
+from otto.utils import partial
+from otto.utils import host_name
+from otto.utils import path_info
+
+
+class Application(Publisher):
+    """ASGI-Application.
+
+    This class adds an ASGI application interface to the HTTP
+    publisher. It takes the same arguments as the WSGI application and
+    ``max_workers`` which is the size of the thread pool used to run
+    controllers that are not coroutine functions and to read response
+    bodies which are not lists (e.g. files).
+
+    The mapper's ``resolve`` method may be a coroutine function (a
+    plain mapper is called in the event loop thread). Use :func:`path`
+    to generate paths using a mapper whose ``reverse`` method is a
+    coroutine function.
+    """
+
+    _executor = None
+
+    def __init__(self, mapper=None, router=None, cache=None, max_workers=8,
+                 lazy=False):
+        super(Application, self).__init__(mapper, router, cache, lazy)
+        self._max_workers = max_workers
+
+    async def __call__(self, scope, receive, send):
+        """ASGI application callable."""
+
+        kind = scope['type']
+        if kind == 'lifespan':
+            return await self.lifespan(receive, send)
+        if kind != 'http':
+            raise ValueError("Unsupported connection type: %r." % kind)
+
+        body = await read_body(receive)
+        environ = make_environ(scope, body)
+        response = await self.publish(environ)
+        await send_response(response, environ, send, self._pool())
+
+    async def lifespan(self, receive, send):
+        """Handle the lifespan protocol; the thread pool is shut down
+        when the server shuts down."""
+
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.close()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    def close(self):
+        """Shut down the thread pool."""
+
+        executor = self._executor
+        if executor is not None:
+            self._executor = None
+            executor.shutdown(wait=False)
+
+    def _pool(self):
+        # the thread pool is created on first use
+        executor = self._executor
+        if executor is None:
+            executor = self._executor = ThreadPoolExecutor(self._max_workers)
+        return executor
+
+    async def publish(self, environ):
+        """Return response for request given by ``environ``."""
+
+        publisher = self
+        if self._hosts is not None:
+            publisher = self.select(host_name(environ))
+
+        match, redirect = publisher.lookup(path_info(environ))
+        if match is None:
+            if redirect is not None:
+                request = Request(dict(environ))
+                request.path_info = redirect
+                return HTTPMovedPermanently(location=request.url)
+            elif self._cache is not None:
+                return not_found(environ)
+            return HTTPNotFound("Page not found.")
+
+        responses = match.route._responses
+        key = None
+        if responses is not None:
+            key = responses.key(match.dict, environ)
+            if key is not None:
+                response = responses.get(key)
+                if response is not None:
+                    return response.conditional(environ)
+
+        # the context of a request task is a copy of the context it
+        # was created in; per-request instances must not be inherited
+        for mapper in publisher._scoped:
+            mapper.clear()
+
+        try:
+            try:
+                controller = await dispatch(
+                    match.route, match.dict, environ['REQUEST_METHOD'])
+            except MethodNotAllowed as e:
+                return method_not_allowed(environ, e.allow)
+            if getattr(controller.func, 'takes_environ', False):
+                request = environ
+            else:
+                request = Request(environ)
+            try:
+                response = await self.call(controller, request)
+            except HTTPError as e:
+                response = e
+            except HTTPException as e:  # pragma no cover
+                response = e.wsgi_response
+        finally:
+            for mapper in publisher._scoped:
+                mapper.clear()
+
+        if key is not None:
+            return responses.store(key, response, environ)
+        return response
+
+    async def call(self, controller, request):
+        """Call ``controller``; if it's not a coroutine function, it's
+        run in the thread pool."""
+
+        if inspect.iscoroutinefunction(getattr(controller, 'func', controller)):
+            return await controller(request)
+
+        executor = self._pool()
+        loop = get_running_loop()
+        if copy_context is None: # pragma no cover
+            return await loop.run_in_executor(executor, controller, request)
+
+        # run in the context of the request (see ``PerRequest``)
+        context = copy_context()
+        return await loop.run_in_executor(
+            executor, context.run, controller, request)
+
+
+async def dispatch(route, matchdict, method=None):
+    """Return controller for ``matchdict``; see
+    :meth:`otto.publisher.Dispatcher.dispatch`."""
+
+    path = matchdict.pop('', None)
+    if path is None:
+        return route.dispatch(matchdict, method)
+
+    if method is not None:
+        route.check(method)
+
+    d = {}
+    for arg in route._prefetch:
+        d[arg] = matchdict.pop(arg)
+    context = route.resolve(path, **d)
+    if inspect.isawaitable(context):
+        context = await context
+    controller = route.bind(type(context), method)
+    if controller is None and route.allow is not None:
+        raise MethodNotAllowed(route.allow)
+    return partial(controller, context, **matchdict)
+
+
+async def path(route, context=None, **matchdict):
+    """Generate route path; the mapper's ``reverse`` method may be a
+    coroutine function."""
+
+    if context is not None:
+        path = route._mapper().reverse(context)
+        if inspect.isawaitable(path):
+            path = await path
+        matchdict[''] = path
+
+    return route._prefix + Route.path(route, **matchdict)
+
+
+async def read_body(receive):
+    """Return request body."""
+
+    chunks = []
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            break
+        chunks.append(message.get('body', b''))
+        if not message.get('more_body'):
+            break
+    return b''.join(chunks)
+
+
+def make_environ(scope, body):
+    """Return WSGI environment for HTTP connection ``scope``."""
+
+    server = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': latin1(scope.get('root_path', '')),
+        'PATH_INFO': latin1(scope['path']),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': 'HTTP/%s' % scope.get('http_version', '1.1'),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+        }
+
+    client = scope.get('client')
+    if client:
+        environ['REMOTE_ADDR'] = client[0]
+
+    for name, value in scope.get('headers', ()):
+        name = name.decode('latin-1').upper().replace('-', '_')
+        if name not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            name = 'HTTP_' + name
+        value = value.decode('latin-1')
+        if name in environ:
+            value = environ[name] + ',' + value
+        environ[name] = value
+
+    return environ
+
+
+async def send_response(response, environ, send, executor=None):
+    """Send WebOb ``response``; unless the body is a list, it's read
+    using ``executor`` such that the event loop isn't blocked."""
+
+    # render exception responses (and any other WSGI application)
+    response = Request(environ).get_response(response)
+
+    headers = [
+        (name.lower().encode('latin-1'), value.encode('latin-1'))
+        for name, value in response.headerlist
+        ]
+
+    await send({
+        'type': 'http.response.start',
+        'status': response.status_code,
+        'headers': headers,
+        })
+
+    app_iter = response.app_iter
+    threaded = executor is not None and not isinstance(app_iter, list)
+    loop = get_running_loop()
+    try:
+        it = iter(app_iter)
+        while True:
+            if threaded:
+                chunk = await loop.run_in_executor(executor, next, it, None)
+            else:
+                chunk = next(it, None)
+            if chunk is None:
+                break
+            if chunk:
+                await send({
+                    'type': 'http.response.body',
+                    'body': chunk,
+                    'more_body': True,
+                    })
+    finally:
+        close = getattr(app_iter, 'close', None)
+        if close is not None:
+            close()
+
+    await send({'type': 'http.response.body', 'body': b''})
+
+
+def latin1(s):
+    """Return WSGI string (UTF-8 bytes decoded as latin-1)."""
+
+    return s.encode('utf-8').decode('latin-1')
@@ -0,0 +1,298 @@
+"""Benchmarks for routing, path generation and publishing.
+
+Run ``python -m otto.benchmarks --help`` for usage. Results are
+emitted as JSON; two result files can be compared using the
+``--compare`` option. The routing tables range from 10 to 10,000
+routes by default; use e.g. ``--sizes 100000`` for larger tables.
+
+Each benchmark runs an operation over a list of inputs. The timing is
+the best of ``repeat`` runs; the memory figures are measured in a
+separate run using :mod:`tracemalloc` (if available): ``blocks`` is
+the number of memory blocks allocated (and not yet freed) per
+operation and ``peak`` is the peak traced memory in bytes.
+"""
+
+import gc
+import os
+import platform
+import subprocess
+import sys
+
+try:
+    from time import perf_counter as timer
+except ImportError: # pragma no cover
+    from time import time as timer
+
+try:
+    import tracemalloc
+except ImportError: # pragma no cover
+    tracemalloc = None
+
+import otto
+
+from otto.publisher import Publisher
+from otto.router import Router
+from otto.router import Route
+from otto.router import TreeRouter
+from otto.router import CompiledRouter
+from otto.utils import quote_path_segment
+
+routers = {
+    'router': Router,
+    'tree': TreeRouter,
+    'compiled': CompiledRouter,
+    }
+
+sizes = (10, 100, 1000, 10000)
+
+
+def table(size):
+    """Return list of route paths for a synthetic routing table.
+
+    For every ten routes, there are five static routes, three routes
+    with ``:segment`` arguments and two routes which end with an
+    asterisk (one with a trailing slash).
+    """
+
+    paths = []
+    for i in range(size):
+        section = i // 10
+        kind = i % 10
+        if kind < 5:
+            path = '/section%d/page%d' % (section, kind)
+        elif kind < 7:
+            path = '/section%d/:id/view%d' % (section, kind)
+        elif kind == 7:
+            path = '/section%d/:year/:month/:slug' % section
+        elif kind == 8:
+            path = '/files%d/*path' % section
+        else:
+            path = '/docs%d/*path/' % section
+        paths.append(path)
+    return paths
+
+
+def requests(size, count=1000):
+    """Return tuple of hit, miss and redirect paths for a table of
+    ``size`` routes; ``count`` paths of each kind, spread evenly over
+    the table."""
+
+    step = max(1, size // count)
+    hits = []
+    misses = []
+    redirects = []
+    for k in range(count):
+        i = k * step % size
+        section = i // 10
+        kind = i % 10
+        if kind < 5:
+            hits.append('/section%d/page%d' % (section, kind))
+        elif kind < 7:
+            hits.append('/section%d/%d/view%d' % (section, i, kind))
+        elif kind == 7:
+            hits.append('/section%d/2012/05/title-%d' % (section, i))
+        elif kind == 8:
+            hits.append('/files%d/a/b/%d.txt' % (section, i))
+        else:
+            hits.append('/docs%d/a/%d/' % (section, i))
+        misses.append('/missing%d/page%d' % (section, kind))
+        redirects.append(hits[-1].rstrip('/') if kind == 9 else
+                         '/section%d/page0/' % section)
+    return hits, misses, redirects
+
+
+def measure(func, inputs, repeat=3):
+    """Return dictionary of results for calling ``func`` with each of
+    ``inputs``."""
+
+    gc.collect()
+    best = None
+    for i in range(repeat):
+        start = timer()
+        for value in inputs:
+            func(value)
+        elapsed = timer() - start
+        if best is None or elapsed < best:
+            best = elapsed
+
+    ops = len(inputs)
+    result = {
+        'ops': ops,
+        'seconds': best,
+        'ns_per_op': best / ops * 1e9,
+        }
+
+    if tracemalloc is not None:
+        tracemalloc.start()
+        try:
+            before = tracemalloc.take_snapshot()
+            for value in inputs:
+                func(value)
+            after = tracemalloc.take_snapshot()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+        blocks = sum(
+            stat.count_diff for stat in after.compare_to(before, 'lineno')
+            if stat.count_diff > 0)
+        result['blocks'] = float(blocks) / ops
+        result['peak'] = peak
+
+    return result
+
+
+def bench_match(router, sizes=sizes, repeat=3):
+    """Benchmark route matching for each table size."""
+
+    factory = routers[router]
+    results = {}
+    for size in sizes:
+        instance = factory()
+        for path in table(size):
+            instance.connect(Route(path))
+        hits, misses, redirects = requests(size)
+        search = instance.search
+
+        # warm up (the compiled router compiles on first use)
+        search(hits[0])
+
+        for name, paths in (
+            ('hit', hits), ('miss', misses), ('redirect', redirects)):
+            key = 'match.%s.%d' % (name, size)
+            results[key] = measure(search, paths, repeat)
+
+    return results
+
+
+def bench_path(repeat=3, count=1000):
+    """Benchmark path generation."""
+
+    route = Route('/section/:year/:month/:slug')
+    values = [
+        {'year': '2012', 'month': '%02d' % (i % 12 + 1), 'slug': 'title %d' % i}
+        for i in range(count)]
+    generate = lambda d: route.path(**d)
+    results = {'path.generate': measure(generate, values, repeat)}
+
+    values = ['segment %d/%d' % (i % 50, i) for i in range(count)]
+    results['path.quote'] = measure(quote_path_segment, values, repeat)
+    return results
+
+
+def bench_publish(router, size=1000, repeat=3, cache=None):
+    """Benchmark application calls using a minimal WSGI
+    environment."""
+
+    from webob import Response
+    from otto.app import Application
+
+    app = Application(router=routers[router](), cache=cache)
+    response = Response('OK')
+    for path in table(size):
+        app.connect(path, controller=lambda request, **kw: response)
+
+    def start_response(status, headers, exc_info=None):
+        pass
+
+    def call(environ):
+        for chunk in app(dict(environ), start_response):
+            pass
+
+    results = {}
+    hits, misses, redirects = requests(size)
+    app.match(hits[0])
+    for name, paths in (
+        ('hit', hits), ('miss', misses), ('redirect', redirects)):
+        environs = [
+            {'REQUEST_METHOD': 'GET', 'PATH_INFO': path,
+             'SCRIPT_NAME': '', 'SERVER_NAME': 'localhost',
+             'SERVER_PORT': '80', 'wsgi.url_scheme': 'http'}
+            for path in paths]
+        key = 'publish.%s.%d' % (name, size)
+        results[key] = measure(call, environs, repeat)
+    return results
+
+
+def bench_startup(router, size=10000, repeat=3, count=10):
+    """Benchmark importing otto and setting up a publisher with
+    ``size`` routes, eagerly and lazily, followed by ``count``
+    matches."""
+
+    code = (
+        "import sys, time; t = time.perf_counter(); import otto; "
+        "print(time.perf_counter() - t); print('webob' in sys.modules)")
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.path.dirname(os.path.dirname(otto.__file__))
+
+    best = None
+    for i in range(repeat):
+        output = subprocess.check_output(
+            [sys.executable, '-c', code], env=env).split()
+        seconds = float(output[0])
+        if best is None or seconds < best:
+            best = seconds
+
+    results = {
+        'startup.import': {
+            'ops': 1,
+            'seconds': best,
+            'ns_per_op': best * 1e9,
+            'webob': output[1] == b'True',
+            }
+        }
+
+    paths = table(size)
+    hits = requests(size, count)[0]
+    for name, lazy in (('eager', False), ('lazy', True)):
+        def setup(value):
+            publisher = Publisher(router=routers[router](), lazy=lazy)
+            for path in paths:
+                publisher.connect(path)
+            for path in hits:
+                publisher.lookup(path)
+
+        key = 'startup.%s.%d' % (name, size)
+        results[key] = measure(setup, [None], repeat)
+
+    return results
+
+
+def run(router='router', sizes=sizes, repeat=3, select=None):
+    """Run benchmarks and return dictionary of results; ``select`` is
+    an optional substring of the groups to run (``match``, ``path``,
+    ``publish`` and ``startup``)."""
+
+    groups = (
+        ('match', lambda: bench_match(router, sizes, repeat)),
+        ('path', lambda: bench_path(repeat)),
+        ('publish', lambda: bench_publish(router, max(sizes), repeat)),
+        ('startup', lambda: bench_startup(router, max(sizes), repeat)),
+        )
+
+    results = {}
+    for name, func in groups:
+        if select is None or select in name:
+            results.update(func())
+
+    return {
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'router': router,
+        'results': results,
+        }
+
+
+def compare(a, b):
+    """Return list of lines comparing the results ``a`` and ``b``."""
+
+    a = a['results']
+    b = b['results']
+    lines = ['%-28s %12s %12s %8s' % ('benchmark', 'a (ns)', 'b (ns)', 'b/a')]
+    for key in sorted(set(a) & set(b)):
+        x = a[key]['ns_per_op']
+        y = b[key]['ns_per_op']
+        lines.append('%-28s %12.0f %12.0f %8.2f' % (key, x, y, y / x))
+    for key in sorted(set(a) ^ set(b)):
+        lines.append('%-28s (only in %s)' % (key, 'a' if key in a else 'b'))
+    return lines
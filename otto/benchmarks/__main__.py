@@ -0,0 +1,55 @@
+import argparse
+import json
+import sys
+
+from otto.benchmarks import compare
+from otto.benchmarks import routers
+from otto.benchmarks import run
+from otto.benchmarks import sizes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m otto.benchmarks',
+        description="Benchmark routing, path generation and publishing.")
+    parser.add_argument(
+        '--router', choices=sorted(routers), default='router',
+        help="routing engine (default: router)")
+    parser.add_argument(
+        '--sizes', default=','.join(map(str, sizes)),
+        help="comma-separated routing table sizes (default: %(default)s)")
+    parser.add_argument(
+        '--repeat', type=int, default=3,
+        help="number of timing runs; the best is used (default: 3)")
+    parser.add_argument(
+        '--select', help="run only benchmarks whose group contains this")
+    parser.add_argument(
+        '--output', help="write JSON results to file (default: stdout)")
+    parser.add_argument(
+        '--compare', nargs=2, metavar=('A', 'B'),
+        help="compare two JSON result files")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        results = []
+        for filename in args.compare:
+            with open(filename) as f:
+                results.append(json.load(f))
+        for line in compare(*results):
+            print(line)
+        return
+
+    results = run(
+        args.router, [int(size) for size in args.sizes.split(',')],
+        args.repeat, args.select)
+
+    data = json.dumps(results, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(data + '\n')
+    else:
+        sys.stdout.write(data + '\n')
+
+
+if __name__ == '__main__':
+    main()
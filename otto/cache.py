@@ -0,0 +1,268 @@
+import threading
+import time
+
+try:
+    from collections import OrderedDict
+except ImportError: # pragma no cover
+    OrderedDict = None
+
+try:
+    from collections import namedtuple
+    CacheInfo = namedtuple(
+        'CacheInfo', 'hits misses evictions maxsize currsize')
+except ImportError: # pragma no cover
+    CacheInfo = tuple
+
+
+class LRUCache(object):
+    """Bounded mapping which evicts the least recently used entry.
+
+    The ``hits``, ``misses`` and ``evictions`` counters are updated
+    by the ``get`` and ``__setitem__`` methods. Insertions are
+    serialized using a lock; lookups are not locked.
+
+    >>> cache = LRUCache(2)
+    >>> cache['a'] = 1
+    >>> cache['b'] = 2
+    >>> cache.get('a')
+    1
+    >>> cache['c'] = 3
+    >>> cache.get('b') is None
+    True
+    >>> cache.info()
+    CacheInfo(hits=1, misses=1, evictions=1, maxsize=2, currsize=2)
+    """
+
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self.hits = self.misses = self.evictions = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def __setitem__(self, key, value):
+        data = self._data
+        with self._lock:
+            data[key] = value
+            touch(data, key)
+            if len(data) > self.maxsize:
+                try:
+                    data.popitem(False)
+                except KeyError: # pragma no cover
+                    pass
+                else:
+                    self.evictions += 1
+
+    def __getitem__(self, key):
+        data = self._data
+        try:
+            value = data[key]
+            touch(data, key)
+        except KeyError:
+            self.misses += 1
+            raise
+
+        self.hits += 1
+        return value
+
+    def get(self, key, default=None):
+        """Return cached value for ``key`` or ``default``."""
+
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def pop(self, key, default=None):
+        """Remove entry for ``key`` and return its value."""
+
+        return self._data.pop(key, default)
+
+    def keys(self):
+        """Return list of keys."""
+
+        return list(self._data)
+
+    def clear(self):
+        """Remove all entries; the counters are not reset."""
+
+        self._data.clear()
+
+    def info(self):
+        """Return cache statistics."""
+
+        return CacheInfo(
+            self.hits, self.misses, self.evictions,
+            self.maxsize, len(self._data))
+
+
+class TTLCache(LRUCache):
+    """Bounded mapping whose entries expire ``ttl`` seconds after they
+    were set; expired entries count as misses.
+
+    >>> now = [0]
+    >>> cache = TTLCache(2, ttl=10, timer=lambda: now[0])
+    >>> cache['a'] = 1
+    >>> now[0] = 5
+    >>> cache.get('a')
+    1
+    >>> now[0] = 11
+    >>> cache.get('a') is None
+    True
+    >>> len(cache)
+    0
+    """
+
+    def __init__(self, maxsize=128, ttl=60, timer=time.time):
+        super(TTLCache, self).__init__(maxsize)
+        self.ttl = ttl
+        self._timer = timer
+
+    def __getitem__(self, key):
+        data = self._data
+        try:
+            expires, value = data[key]
+            if expires <= self._timer():
+                del data[key]
+                raise KeyError(key)
+            touch(data, key)
+        except KeyError:
+            self.misses += 1
+            raise
+
+        self.hits += 1
+        return value
+
+    def __setitem__(self, key, value):
+        expires = self._timer() + self.ttl
+        super(TTLCache, self).__setitem__(key, (expires, value))
+
+    def pop(self, key, default=None):
+        """Remove entry for ``key`` and return its value."""
+
+        entry = self._data.pop(key, None)
+        if entry is None:
+            return default
+        return entry[1]
+
+
+class ClockCache(object):
+    """Bounded mapping which evicts entries using the CLOCK algorithm.
+
+    Entries are kept in a ring of slots, each with a reference bit
+    which is set on a cache hit. On insertion, the clock hand skips
+    (and clears) referenced slots and evicts the first entry which
+    has not been used since the hand last passed it.
+
+    Unlike :class:`LRUCache`, a hit does not reorder anything, which
+    makes lookups cheap; insertions are serialized using a lock. With
+    a ``maxsize`` of zero, nothing is stored.
+
+    >>> cache = ClockCache(2)
+    >>> cache['a'] = 1
+    >>> cache['b'] = 2
+    >>> cache['a']
+    1
+    >>> cache['c'] = 3
+    >>> sorted(cache._data)
+    ['a', 'c']
+    >>> cache.info()
+    CacheInfo(hits=1, misses=0, evictions=1, maxsize=2, currsize=2)
+    """
+
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self.hits = self.misses = self.evictions = 0
+        self._data = {}
+        self._keys = []
+        self._ref = bytearray(maxsize)
+        self._hand = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def __getitem__(self, key):
+        try:
+            value, slot = self._data[key]
+        except KeyError:
+            self.misses += 1
+            raise
+
+        self._ref[slot] = 1
+        self.hits += 1
+        return value
+
+    def __setitem__(self, key, value):
+        if self.maxsize <= 0:
+            return
+
+        data = self._data
+        keys = self._keys
+        with self._lock:
+            entry = data.get(key)
+            if entry is not None:
+                data[key] = value, entry[1]
+                return
+
+            if len(keys) < self.maxsize:
+                data[key] = value, len(keys)
+                keys.append(key)
+                return
+
+            ref = self._ref
+            hand = self._hand
+            while ref[hand]:
+                ref[hand] = 0
+                hand = (hand + 1) % self.maxsize
+
+            del data[keys[hand]]
+            self.evictions += 1
+            keys[hand] = key
+            data[key] = value, hand
+            self._hand = (hand + 1) % self.maxsize
+
+    def get(self, key, default=None):
+        """Return cached value for ``key`` or ``default``."""
+
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def clear(self):
+        """Remove all entries; the counters are not reset."""
+
+        with self._lock:
+            self._data.clear()
+            del self._keys[:]
+            self._ref = bytearray(self.maxsize)
+            self._hand = 0
+
+    def info(self):
+        """Return cache statistics."""
+
+        return CacheInfo(
+            self.hits, self.misses, self.evictions,
+            self.maxsize, len(self._data))
+
+
+def touch(data, key):
+    """Mark ``key`` as most recently used; a key which has just been
+    evicted by another thread is ignored."""
+
+    try:
+        try:
+            data.move_to_end(key)
+        except AttributeError: # pragma no cover
+            data[key] = data.pop(key)
+    except KeyError:
+        pass
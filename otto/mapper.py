@@ -0,0 +1,214 @@
+"""Mapper lifecycles.
+
+By default, the mapper of a route is instantiated for each request
+(and each generated path) with the match dictionary values that come
+before the asterisk. The classes in this module wrap a mapper class to
+reuse its instances instead::
+
+  app.connect("/:tenant/*", mapper=Pool(TenantMapper, size=100))
+
+The :class:`Traverser` is a mapper which caches traversal results.
+"""
+
+import threading
+
+try:
+    from contextvars import ContextVar
+except ImportError: # pragma no cover
+    ContextVar = None
+
+from otto.cache import LRUCache
+from otto.cache import TTLCache
+
+_marker = object()
+
+
+class Singleton(object):
+    """Mapper which is instantiated once.
+
+    It can't be used with routes that pass match dictionary values to
+    the mapper (use :class:`Pool` instead).
+    """
+
+    _instance = None
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._lock = threading.Lock()
+
+    def __call__(self, **matchdict):
+        if matchdict:
+            raise TypeError(
+                "Singleton mapper does not accept arguments: %s." %
+                ", ".join(map(repr, sorted(matchdict))))
+
+        instance = self._instance
+        if instance is None:
+            with self._lock:
+                if self._instance is None:
+                    self._instance = self._factory()
+                instance = self._instance
+        return instance
+
+
+class Pool(object):
+    """Mapper which keeps an instance for each distinct set of
+    arguments; at most ``size`` instances are kept (the least recently
+    used instance is evicted)."""
+
+    def __init__(self, factory, size=128):
+        self._factory = factory
+        self._instances = LRUCache(size)
+
+    def __call__(self, **matchdict):
+        key = tuple(sorted(matchdict.items()))
+        instances = self._instances
+        try:
+            return instances[key]
+        except KeyError:
+            instance = instances[key] = self._factory(**matchdict)
+            return instance
+
+    def info(self):
+        """Return pool statistics."""
+
+        return self._instances.info()
+
+
+class PerRequest(object):
+    """Mapper which keeps its instances for the duration of a request.
+
+    Instances are kept per context (per thread before Python 3.7),
+    such that concurrent requests of an ASGI application each have
+    their own; the application clears them before and after it
+    publishes a response.
+    """
+
+    scoped = True
+
+    def __init__(self, factory):
+        self._factory = factory
+        if ContextVar is not None:
+            self._instances = ContextVar('otto.mapper.PerRequest', default=None)
+        else: # pragma no cover
+            self._instances = Local()
+
+    def __call__(self, **matchdict):
+        instances = self._instances.get()
+        if instances is None:
+            instances = {}
+            self._instances.set(instances)
+
+        key = tuple(sorted(matchdict.items()))
+        try:
+            return instances[key]
+        except KeyError:
+            instance = instances[key] = self._factory(**matchdict)
+            return instance
+
+    def clear(self):
+        """Discard the instances of the current context."""
+
+        self._instances.set(None)
+
+
+class Local(threading.local):
+    """Thread-local value with the interface of a context variable."""
+
+    value = None
+
+    def get(self):
+        return self.value
+
+    def set(self, value):
+        self.value = value
+
+
+class Traverser(object):
+    """Mapper which resolves paths by traversal from ``root``.
+
+    Each path segment is resolved by calling ``traverse`` (by default,
+    ``__getitem__``) on the previous context. Intermediate contexts
+    are cached by path prefix such that only the segments which come
+    after the longest cached prefix are traversed.
+
+    At most ``size`` contexts are cached; if ``ttl`` is given, they
+    expire after this number of seconds. Use ``invalidate`` when
+    objects are changed or removed.
+
+    The traverser is its own mapper instance; it does not accept
+    match dictionary values.
+    """
+
+    def __init__(self, root, size=1024, ttl=None):
+        self._root = root
+        if ttl is None:
+            self._cache = LRUCache(size)
+        else:
+            self._cache = TTLCache(size, ttl)
+
+    def __call__(self, **matchdict):
+        if matchdict:
+            raise TypeError(
+                "Traverser does not accept arguments: %s." %
+                ", ".join(map(repr, sorted(matchdict))))
+        return self
+
+    def resolve(self, path):
+        """Return context for the path tuple ``path``."""
+
+        path = tuple(path)
+        cache = self._cache
+
+        i = len(path)
+        while i:
+            context = cache.get(path[:i], _marker)
+            if context is not _marker:
+                break
+            i -= 1
+        else:
+            context = self._root
+
+        traverse = self.traverse
+        while i < len(path):
+            context = traverse(context, path[i])
+            i += 1
+            cache[path[:i]] = context
+
+        return context
+
+    def reverse(self, context):
+        """Return path tuple for ``context`` using its ``__name__``
+        and ``__parent__`` attributes."""
+
+        path = []
+        root = self._root
+        while context is not root:
+            path.append(context.__name__)
+            context = context.__parent__
+        path.reverse()
+        return tuple(path)
+
+    def traverse(self, context, name):
+        """Return the item ``name`` of ``context``."""
+
+        return context[name]
+
+    def invalidate(self, path=()):
+        """Remove the cached contexts at and below ``path``."""
+
+        path = tuple(path)
+        cache = self._cache
+        if not path:
+            cache.clear()
+            return
+
+        length = len(path)
+        for key in cache.keys():
+            if key[:length] == path:
+                cache.pop(key)
+
+    def info(self):
+        """Return cache statistics."""
+
+        return self._cache.info()
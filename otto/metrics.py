@@ -0,0 +1,225 @@
+"""Request metrics.
+
+The :class:`Metrics` registry keeps counters and latency histograms
+for each route. Pass it to the application and connect it to a route
+to export the data in the Prometheus text format::
+
+  metrics = Metrics()
+  app = Application(metrics=metrics)
+  app.connect('/metrics', controller=metrics)
+
+The histogram buckets are allocated when a route is first matched;
+recording a request only increments existing counters. The counters
+are not locked; under concurrent updates, an increment may
+occasionally be lost.
+"""
+
+import operator
+
+from bisect import bisect_left
+
+try:
+    from time import perf_counter as timer
+except ImportError: # pragma no cover
+    from time import time as timer
+
+from webob import Response
+
+# latency buckets (upper bounds, in seconds)
+buckets = (
+    .00001, .000025, .00005, .0001, .00025, .0005, .001,
+    .0025, .005, .01, .025, .05, .1, .25, .5, 1.0, 2.5, 5.0, 10.0)
+
+# status classes
+classes = ('other', '1xx', '2xx', '3xx', '4xx', '5xx')
+
+
+class Histogram(object):
+    """Latency histogram with fixed buckets.
+
+    >>> histogram = Histogram((0.1, 1.0))
+    >>> histogram.observe(0.05)
+    >>> histogram.observe(0.5)
+    >>> histogram.observe(5)
+    >>> histogram.counts
+    [1, 1, 1]
+    """
+
+    def __init__(self, buckets=buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def lines(self, name, labels):
+        """Return exposition lines."""
+
+        total = 0
+        result = []
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            result.append('%s_bucket{%sle="%r"} %d' % (
+                name, labels, bound, total))
+        total += self.counts[-1]
+        result.append('%s_bucket{%sle="+Inf"} %d' % (name, labels, total))
+        labels = labels.rstrip(',')
+        result.append('%s_sum{%s} %r' % (name, labels, self.sum))
+        result.append('%s_count{%s} %d' % (name, labels, total))
+        return result
+
+
+class RouteMetrics(object):
+    """Counters and histograms for a single route."""
+
+    def __init__(self, buckets=buckets):
+        self.requests = 0
+        self.statuses = [0] * len(classes)
+        self.match = Histogram(buckets)
+        self.resolve = Histogram(buckets)
+        self.controller = Histogram(buckets)
+
+    def record(self, match, resolve, controller, status):
+        """Record request given the time spent on matching, resolving
+        (dispatching) and calling the controller, and the status
+        code."""
+
+        self.requests += 1
+        self.match.observe(match)
+        self.resolve.observe(resolve)
+        self.controller.observe(controller)
+        status //= 100
+        if not 0 < status < 6:
+            status = 0
+        self.statuses[status] += 1
+
+
+class Metrics(object):
+    """Registry of route metrics.
+
+    Instances are callable as a controller which returns the metrics
+    in the Prometheus text format.
+    """
+
+    content_type = 'text/plain; version=0.0.4'
+
+    def __init__(self, prefix='otto', buckets=buckets):
+        self.prefix = prefix
+        self.buckets = tuple(buckets)
+        self.redirects = 0
+        self.not_found = 0
+        self._routes = {}
+        self._series = {}
+
+    def __call__(self, request):
+        return Response(
+            self.exposition(), content_type=self.content_type,
+            charset='utf-8')
+
+    def route(self, route):
+        """Return metrics for ``route``.
+
+        Routes are identified by their full path (including the mount
+        prefix) and host; routes which share both share their
+        metrics."""
+
+        try:
+            return self._routes[route]
+        except KeyError:
+            pass
+
+        key = labels(route)
+        metrics = self._series.get(key)
+        if metrics is None:
+            metrics = self._series.setdefault(key, RouteMetrics(self.buckets))
+        return self._routes.setdefault(route, metrics)
+
+    def discard(self, route):
+        """Drop the metrics of ``route`` (unless another route shares
+        them), e.g. when it's disconnected."""
+
+        metrics = self._routes.pop(route, None)
+        if metrics is None:
+            return
+        for other in list(self._routes.values()):
+            if other is metrics:
+                return
+        self._series.pop(labels(route), None)
+
+    def miss(self, redirect):
+        """Record request which didn't match a route."""
+
+        if redirect is None:
+            self.not_found += 1
+        else:
+            self.redirects += 1
+
+    def exposition(self):
+        """Return metrics in the Prometheus text format."""
+
+        prefix = self.prefix
+        routes = [
+            (format_labels(key), metrics) for key, metrics in sorted(
+                list(self._series.items()), key=operator.itemgetter(0))]
+
+        lines = [
+            '# TYPE %s_redirects_total counter' % prefix,
+            '%s_redirects_total %d' % (prefix, self.redirects),
+            '# TYPE %s_not_found_total counter' % prefix,
+            '%s_not_found_total %d' % (prefix, self.not_found),
+            '# TYPE %s_requests_total counter' % prefix,
+            ]
+
+        for route, metrics in routes:
+            lines.append('%s_requests_total{%s} %d' % (
+                prefix, route, metrics.requests))
+
+        lines.append('# TYPE %s_responses_total counter' % prefix)
+        for route, metrics in routes:
+            for name, count in zip(classes, metrics.statuses):
+                if count:
+                    lines.append('%s_responses_total{%s,code="%s"} %d' % (
+                        prefix, route, name, count))
+
+        for name in ('match', 'resolve', 'controller'):
+            metric = '%s_%s_seconds' % (prefix, name)
+            lines.append('# TYPE %s histogram' % metric)
+            for route, metrics in routes:
+                lines.extend(
+                    getattr(metrics, name).lines(metric, route + ','))
+
+        return '\n'.join(lines) + '\n'
+
+
+def labels(route):
+    """Return tuple of the full path and the host of ``route``."""
+
+    return (getattr(route, '_prefix', '') + route._path,
+            getattr(route, 'host', None) or '')
+
+
+def format_labels(key):
+    """Return label string for the path and host ``key``.
+
+    >>> print(format_labels(('/api/:name', '')))
+    route="/api/:name"
+    >>> print(format_labels(('/:name', '*.example.com')))
+    route="/:name",host="*.example.com"
+    """
+
+    path, host = key
+    if host:
+        return 'route="%s",host="%s"' % (escape(path), escape(host))
+    return 'route="%s"' % escape(path)
+
+
+def escape(value):
+    """Escape label value.
+
+    >>> print(escape('/"a"\\\\b'))
+    /\\"a\\"\\\\b
+    """
+
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
@@ -0,0 +1,164 @@
+"""Precompiled regular expressions.
+
+Compiling the regular expressions of a large routing table accounts
+for nearly all of the time it takes to set up the routes. This module
+keeps the compiled form of each expression (the program of the
+regular expression engine) in a file which can be loaded at startup::
+
+  from otto import precompiled
+  precompiled.load('/var/cache/app/routes.json')
+
+  # connect routes ...
+
+  precompiled.save('/var/cache/app/routes.json')
+
+Entries are keyed by the expression; routes which have changed are
+compiled as usual. Expressions are recorded for saving from the call
+to :func:`load` until the call to :func:`save` only, such that routes
+which are connected at runtime don't accumulate. The file includes a
+fingerprint of the file format and of the regular expression engine;
+if it doesn't match, the file is ignored.
+"""
+
+import json
+import os
+import platform
+import re
+import sys
+
+try:
+    import _sre
+    try:
+        from re import _compiler as sre_compile
+        from re import _parser as sre_parse
+    except ImportError: # pragma no cover
+        import sre_compile
+        import sre_parse
+except ImportError: # pragma no cover
+    _sre = None
+
+# the code generator of the regular expression compiler is private;
+# without it, expressions can be loaded but not saved
+_code = getattr(_sre and sre_compile, '_code', None)
+
+FORMAT = 1
+
+# compiled form of each expression (loaded from file)
+_loaded = {}
+
+# expressions compiled by this process (while recording)
+_used = set()
+_recording = False
+
+
+def fingerprint():
+    """Return fingerprint of the file format and the regular
+    expression engine."""
+
+    return "%d:%s:%s:%s" % (
+        FORMAT, platform.python_implementation(),
+        getattr(_sre, 'MAGIC', None), sys.version.split()[0])
+
+
+def compile(expression):
+    """Return compiled regular expression for ``expression``; this
+    is equivalent to :func:`re.compile`."""
+
+    if _recording:
+        _used.add(expression)
+    entry = _loaded.get(expression)
+    if entry is not None:
+        flags, code, groups, groupindex, indexgroup = entry
+        try:
+            return _sre.compile(
+                expression, flags, code, groups, groupindex,
+                tuple(indexgroup))
+        except (TypeError, ValueError, RuntimeError): # pragma no cover
+            del _loaded[expression]
+    return re.compile(expression)
+
+
+def dump(expression):
+    """Return the compiled form of ``expression`` as a list or
+    ``None`` if it's not available on this Python version."""
+
+    if _code is None: # pragma no cover
+        return
+
+    p = sre_parse.parse(expression, 0)
+    code = [int(op) for op in _code(p, 0)]
+    state = getattr(p, 'state', None) or p.pattern
+    groupindex = dict(state.groupdict)
+    indexgroup = [None] * state.groups
+    for k, i in groupindex.items():
+        indexgroup[i] = k
+    return [int(state.flags), code, state.groups - 1, groupindex, indexgroup]
+
+
+def load(filename):
+    """Load compiled expressions from ``filename`` and return the
+    number of entries; a missing or outdated file is ignored.
+
+    The expressions which are compiled from now on are recorded (see
+    :func:`save`)."""
+
+    global _recording
+    _recording = True
+
+    if _sre is None: # pragma no cover
+        return 0
+
+    try:
+        with open(filename) as f:
+            data = json.load(f)
+    except (IOError, OSError, ValueError):
+        return 0
+
+    if not isinstance(data, dict) or \
+           data.get('fingerprint') != fingerprint():
+        return 0
+
+    _loaded.update(data['patterns'])
+    return len(data['patterns'])
+
+
+def save(filename):
+    """Save the expressions compiled since :func:`load` was called to
+    ``filename`` and stop recording. Nothing is saved if the
+    compiled form isn't available on this Python version."""
+
+    global _recording
+    _recording = False
+
+    if _code is None:
+        return
+
+    patterns = {}
+    for expression in _used:
+        entry = _loaded.get(expression)
+        if entry is None:
+            entry = dump(expression)
+        patterns[expression] = entry
+
+    data = {'fingerprint': fingerprint(), 'patterns': patterns}
+    temp = '%s.%d.tmp' % (filename, os.getpid())
+    with open(temp, 'w') as f:
+        json.dump(data, f)
+
+    try:
+        replace = os.replace
+    except AttributeError: # pragma no cover
+        if os.path.exists(filename):
+            os.remove(filename)
+        replace = os.rename
+    replace(temp, filename)
+
+
+def clear():
+    """Forget the loaded and compiled expressions and stop
+    recording."""
+
+    global _recording
+    _recording = False
+    _loaded.clear()
+    _used.clear()
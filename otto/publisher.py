@@ -1,11 +1,31 @@
 import re
+import warnings
 
 from otto.utils import partial
+from otto.cache import LRUCache
+from otto.responses import ResponseCache
 from otto.router import Router
+from otto.router import CompiledRouter
+from otto.router import analyze
 from otto.router import Route
+from otto.router import Match
+from otto.router import re_stararg
 
 re_prefetch = re.compile(r'(?:(?::([a-z]+))[^:]+)+(?<!\\)\*(?![A-Za-z])')
 
+class MethodNotAllowed(Exception):
+    """Raised by :meth:`Dispatcher.dispatch` if there's no controller
+    for the request method; ``allow`` is the value of the ``Allow``
+    header."""
+
+    def __init__(self, allow):
+        Exception.__init__(self, allow)
+        self.allow = allow
+
+class ShadowedRouteWarning(UserWarning):
+    """Issued by :meth:`Publisher.freeze` for a route which can never
+    match because an earlier route matches all of its paths."""
+
 class Publisher(object):
     """HTTP publisher.
 
@@ -15,70 +35,480 @@ class Publisher(object):
     Route definitions are added using the ``route`` method. It takes
     an optional ``mapper`` argument which is then used in place of
     the default value.
+
+    The ``router`` argument is also optional; it may be used to
+    provide a different routing engine, e.g. :class:`TreeRouter`.
+
+    If ``cache`` is given, up to this number of paths are kept in a
+    cache of route matches (including paths which do not match any
+    route). The cache is cleared when a route is added or removed.
+
+    Each host may have its own routing table; see :meth:`host`.
     """
 
-    def __init__(self, mapper=None):
+    _cache = None
+    _scoped = ()
+    _frozen = False
+    _host = None
+    _hosts = None
+    _mounts = None
+    _parent = None
+    _prefix = ''
+
+    def __init__(self, mapper=None, router=None, cache=None, lazy=False):
         """The optional ``mapper`` argument specifies the default
-        route mapper."""
+        route mapper; ``router`` specifies the routing engine and
+        ``cache`` the size of the match cache. If ``lazy`` is set,
+        routes are compiled on first use."""
+
+        if router is None:
+            router = Router()
 
-        self._router = Router()
+        self._router = router
         self._mapper = mapper
+        self._lazy = lazy
+        self._scope(mapper)
+
+        if cache is not None:
+            self._cache = LRUCache(cache)
+
+    def host(self, name):
+        """Return publisher for the host ``name`` with its own routing
+        table; it's created on first use with the settings of this
+        publisher.
+
+        A name such as ``*.example.com`` matches any subdomain; the
+        most specific name applies. Requests to other hosts are
+        published using the routing table of this publisher.
+        """
+
+        if self._hosts is None:
+            self._hosts = {}
+            self._wildcards = {}
+
+        name = name.lower()
+        if name.startswith('*.'):
+            index, key = self._wildcards, name[1:]
+        else:
+            index, key = self._hosts, name
+
+        publisher = index.get(key)
+        if publisher is None:
+            cache = self._cache
+            publisher = Publisher(
+                self._mapper, type(self._router)(),
+                cache and cache.maxsize, self._lazy)
+            publisher._host = name
+            publisher._parent = self
+            index[key] = publisher
+        return publisher
+
+    def select(self, host):
+        """Return the publisher for requests to ``host`` (a host name
+        without port)."""
+
+        hosts = self._hosts
+        if hosts is None:
+            return self
+
+        publisher = hosts.get(host)
+        if publisher is not None:
+            return publisher
+
+        wildcards = self._wildcards
+        i = host.find('.')
+        while i != -1:
+            publisher = wildcards.get(host[i:])
+            if publisher is not None:
+                return publisher
+            i = host.find('.', i + 1)
+        return self
 
     def match(self, path):
         """Match ``path`` with routing table and return route controller."""
 
-        gen = self._router(path)
-        try:
-            match = next(gen)
-        except StopIteration:
+        if self._cache is None and self._mounts is None:
+            match = self._router.match(path)
+        else:
+            match = self.lookup(path)[0]
+
+        if match is None:
             return
 
         route = match.route
         return route.dispatch(match.dict)
 
+    def lookup(self, path):
+        """Return tuple of route match and redirect path for ``path``.
+
+        The redirect path is the path with the trailing slash toggled;
+        it's provided only if there's no match for ``path``.
+
+        Paths below the prefix of a mounted publisher are looked up
+        using that publisher only.
+        """
+
+        mounts = self._mounts
+        if mounts is not None:
+            # try the path and each parent path (longest first)
+            i = len(path)
+            while i > 0:
+                publisher = mounts.get(path[:i])
+                if publisher is not None:
+                    match, redirect = publisher.lookup(path[i:])
+                    if redirect is not None:
+                        redirect = path[:i] + redirect
+                    return match, redirect
+                i = path.rfind('/', 0, i)
+
+        cache = self._cache
+        if cache is None:
+            return self._router.search(path)
+
+        result = cache.get(path)
+        if result is None:
+            result = cache[path] = self._router.search(path)
+
+        match, redirect = result
+        if match is not None:
+            return Match(match.route, dict(match.dict)), None
+        return result
+
     def connect(self, path, controller=None, mapper=None):
         """Use this method to add routes."""
 
-        if mapper is None:
-            mapper = self._mapper
-        route = Dispatcher(path, controller=controller, mapper=mapper)
+        if self._frozen:
+            raise RuntimeError("Routing table is frozen.")
+        route = Dispatcher(
+            path, controller=controller, mapper=mapper, lazy=self._lazy)
+        self._adopt(route)
         self._router.connect(route)
+        self._renew_cache()
         return route
 
+    def disconnect(self, route):
+        """Remove ``route`` (as returned by :meth:`connect`); routes
+        can be removed while requests are being published."""
+
+        if self._frozen:
+            raise RuntimeError("Routing table is frozen.")
+        self._router.disconnect(route)
+        self._renew_cache()
+        self._discard((route, ))
+
+    def replace(self, routes):
+        """Replace all routes with ``routes``, a sequence of
+        :class:`Dispatcher` instances (e.g. routes returned by
+        :meth:`connect`); the change is made at once."""
+
+        if self._frozen:
+            raise RuntimeError("Routing table is frozen.")
+        routes = list(routes)
+        for route in routes:
+            self._adopt(route)
+
+        previous = self._router.replace(routes)
+        self._renew_cache()
+
+        kept = set(map(id, routes))
+        self._discard([route for route in previous if id(route) not in kept])
+
+    def _adopt(self, route):
+        # prepare a route for this publisher's routing table
+        if route._mapper is None:
+            route._mapper = self._mapper
+        route.host = self._host
+        route._prefix = self._prefix
+        self._scope(route._mapper)
+
+    def _discard(self, routes):
+        # routes have been removed; the root publisher drops their
+        # cached responses and any other state kept for them (see
+        # ``Application``)
+        if self._parent is not None:
+            self._parent._discard(routes)
+            return
+        for route in routes:
+            route.invalidate()
+
+    def mount(self, prefix, publisher):
+        """Mount ``publisher`` at the path ``prefix``, e.g. ``/api``.
+
+        Paths below the prefix are matched using the routes of the
+        mounted publisher only (without the prefix); the paths
+        generated by its routes include the prefix. A publisher can
+        be mounted only once.
+
+        The WSGI environment is not changed: ``PATH_INFO`` is still
+        the full path which is consistent with the generated paths.
+        """
+
+        if self._frozen:
+            raise RuntimeError("Routing table is frozen.")
+
+        prefix = '/' + prefix.strip('/')
+        if self._mounts is None:
+            self._mounts = {}
+        self._mounts[prefix] = publisher
+        publisher._set_prefix(self._prefix + prefix)
+        publisher._parent = self
+        for mapper in publisher._scoped:
+            self._scope(mapper)
+        self._renew_cache()
+        return publisher
+
+    def _set_prefix(self, prefix):
+        self._prefix = prefix
+        for route in self._router._routes:
+            route._prefix = prefix
+        if self._mounts is not None:
+            for path, publisher in self._mounts.items():
+                publisher._set_prefix(prefix + path)
+
+    def freeze(self):
+        """Finalize the routing table.
+
+        Routes which are shadowed by an earlier route are reported
+        using :class:`ShadowedRouteWarning` and left out of the
+        table. The remaining routes are moved to a new routing engine
+        of the same kind (the default engine is replaced by
+        :class:`CompiledRouter`), which is compiled at once.
+
+        Returns a dictionary which maps each route to the tuple of
+        earlier routes that may match the same paths. Routes can no
+        longer be added. The publishers of hosts and mounted
+        publishers are frozen too.
+        """
+
+        if self._hosts is not None:
+            for index in (self._hosts, self._wildcards):
+                for publisher in index.values():
+                    publisher.freeze()
+
+        if self._mounts is not None:
+            for publisher in self._mounts.values():
+                publisher.freeze()
+
+        router = self._router
+        routes = list(router._routes)
+        shadowed, precedence = analyze(routes)
+
+        for route, by in shadowed:
+            warnings.warn(
+                "Route %r is shadowed by %r." % (route._path, by._path),
+                ShadowedRouteWarning, stacklevel=2)
+
+        if type(router) is Router:
+            frozen = CompiledRouter()
+        else:
+            frozen = type(router)()
+
+        hidden = set(route for route, by in shadowed)
+        for route in routes:
+            if route not in hidden:
+                frozen.connect(route)
+
+        compile = getattr(frozen, 'compile', None)
+        if compile is not None:
+            compile()
+
+        self._router = frozen
+        self._frozen = True
+        self._renew_cache()
+        self._discard(list(hidden))
+        return precedence
+
+    def _scope(self, mapper):
+        # mappers which keep instances for the duration of a request
+        # (see :class:`otto.mapper.PerRequest`) are cleared by the
+        # application after each request; the publisher of a host or
+        # a mounted publisher passes them on to its parent
+        if getattr(mapper, 'scoped', False) and mapper not in self._scoped:
+            self._scoped += (mapper, )
+            if self._parent is not None:
+                self._parent._scope(mapper)
+
+    def _renew_cache(self):
+        # the match cache is replaced rather than cleared such that a
+        # lookup which is concurrent with a change of the routing
+        # table can't leave a stale entry in it
+        cache = self._cache
+        if cache is not None:
+            renewed = LRUCache(cache.maxsize)
+            renewed.hits = cache.hits
+            renewed.misses = cache.misses
+            renewed.evictions = cache.evictions
+            self._cache = renewed
+
+    def cache_info(self):
+        """Return match cache statistics or ``None`` if the cache is
+        not enabled."""
+
+        if self._cache is not None:
+            return self._cache.info()
+
 class Dispatcher(Route):
     """Route which integrates with publisher."""
 
     _prefetch = ()
 
-    def __init__(self, path, controller=None, mapper=None):
-        super(Dispatcher, self).__init__(path)
+    # value of the ``Allow`` header if controllers are registered for
+    # particular request methods
+    allow = None
+
+    # host name if the route belongs to a host (see ``Publisher.host``)
+    host = None
+
+    # mount prefix (see ``Publisher.mount``)
+    _prefix = ''
+
+    # response cache (see ``cached``)
+    _responses = None
+
+    def __init__(self, path, controller=None, mapper=None, lazy=False):
+        super(Dispatcher, self).__init__(path, lazy)
         self._mapper = mapper
         self._controllers = {object: controller}
+        self._methods = {}
+        self._bound = {}
+        self._bound_methods = {}
 
         m = re_prefetch.search(path)
         if m is not None:
             self._prefetch = m.groups()
 
+        m = re_stararg.search(path)
+        self._mapping = m is not None and not m.group('name')
+
     def __call__(self, controller):
         self._controllers[object] = controller
+        self._bound = {}
+        self._bound_methods = {}
+        if self._responses is not None:
+            self._responses.clear()
         return self
 
-    def bind(self, type=None):
+    def cached(self, ttl=60, vary=(), size=1024):
+        """Cache up to ``size`` responses to ``GET`` requests for
+        ``ttl`` seconds; ``vary`` is a sequence of request header names
+        which are part of the key (besides the match dictionary and the
+        query string). Returns the route, such that it can be used as
+        a decorator::
+
+          @app.connect('/about').cached(ttl=300)
+          def about(request):
+              ...
+
+        See :mod:`otto.responses`."""
+
+        self._responses = ResponseCache(size, ttl, vary)
+        return self
+
+    def invalidate(self, **matchdict):
+        """Remove cached responses whose match dictionary includes
+        the given values (all responses if no values are given); return
+        the number of responses removed."""
+
+        if self._responses is None:
+            return 0
+        return self._responses.invalidate(**matchdict)
+
+    def cache_info(self):
+        """Return response cache statistics or ``None`` if responses
+        are not cached."""
+
+        if self._responses is not None:
+            return self._responses.info()
+
+    def bind(self, type=None, method=None):
         """Return controller; if ``type`` is specified, use adaptation
-        on the type hierarchy."""
+        on the type hierarchy.
+
+        If ``method`` is specified, a controller registered for this
+        request method takes precedence over one registered for any
+        method (for ``HEAD``, the ``GET`` controller is used if no
+        controller is registered for ``HEAD``).
+
+        The result is remembered for each type until a controller is
+        registered."""
 
         if type is None:
             type = object
+
+        if method is not None and self._methods:
+            return self._bind_method(type, method)
+
+        bound = self._bound
+        try:
+            return bound[type]
+        except KeyError:
+            pass
+
+        controller = None
         get = self._controllers.get
         for base in type.__mro__:
             controller = get(base)
             if controller is not None:
-                return controller
+                break
+
+        bound[type] = controller
+        return controller
+
+    def _bind_method(self, type, method):
+        key = method, type
+        bound = self._bound_methods
+        try:
+            return bound[key]
+        except KeyError:
+            pass
+
+        controller = None
+        get = self._methods.get
+        for base in type.__mro__:
+            controller = get((method, base))
+            if controller is None and method == 'HEAD':
+                controller = get(('GET', base))
+            if controller is None:
+                controller = self._controllers.get(base)
+            if controller is not None:
+                break
 
-    def controller(self, controller=None, type=None):
+        bound[key] = controller
+        return controller
+
+    def bindings(self):
+        """Return dictionary which maps the registered types (and
+        the types that have since been bound) to their controller."""
+
+        types = set(self._controllers)
+        types.update(self._bound)
+        return dict((type, self.bind(type)) for type in types)
+
+    def controller(self, controller=None, type=None, method=None,
+                   methods=None):
         """Register ``controller`` for this route; if ``type`` is
         provided, the controller is used only for objects that contain
-        this type in its class hierarchy."""
+        this type in its class hierarchy.
+
+        If ``method`` (or a sequence of ``methods``) is provided, the
+        controller is used only for these request methods. For other
+        methods, the application responds with ``405 Method Not
+        Allowed`` (unless a controller is registered for any method);
+        it also responds to ``OPTIONS`` requests unless a controller is
+        registered for that method."""
+
+        if method is not None:
+            methods = (method, )
+        if methods is not None:
+            def handler(func):
+                for name in methods:
+                    self._methods[name.upper(), type or object] = func
+                self._update()
+                return func
+            if controller is not None:
+                handler(controller)
+                return self
+            return handler
 
         if type is None:
             type = object
@@ -87,21 +517,57 @@ class Dispatcher(Route):
         def handler(func):
             for cls in type.__mro__:
                 self._controllers[cls] = func
+            self._bound = {}
+            self._bound_methods = {}
             return func
         return handler
 
-    def dispatch(self, matchdict):
+    def _update(self):
+        names = set(method for method, type in self._methods)
+        if 'GET' in names:
+            names.add('HEAD')
+        self._allowed = frozenset(names)
+        names.add('OPTIONS')
+        self.allow = ", ".join(sorted(names))
+        self._bound_methods = {}
+
+    def dispatch(self, matchdict, method=None):
+        """Return controller for ``matchdict``, bound to the matched
+        values (and the context, if object mapping is used).
+
+        If ``method`` is given and controllers are registered for
+        particular request methods, :class:`MethodNotAllowed` is raised
+        if there's no controller for the method; this is checked
+        before the context is resolved if possible."""
+
+        if method is not None:
+            self.check(method)
+
         path = matchdict.pop('', None)
         if path is not None:
             d = {}
             for arg in self._prefetch:
                 d[arg] = matchdict.pop(arg)
             context = self.resolve(path, **d)
-            controller = self.bind(type(context))
-            return partial(controller, context, **matchdict)
+            controller = self.bind(type(context), method)
+            args = (context, )
         else:
-            controller = self.bind()
-            return partial(controller, **matchdict)
+            controller = self.bind(None, method)
+            args = ()
+
+        if controller is None and method is not None and \
+               self.allow is not None:
+            raise MethodNotAllowed(self.allow)
+
+        return partial(controller, *args, **matchdict)
+
+    def check(self, method):
+        """Raise :class:`MethodNotAllowed` if no controller can handle
+        the request ``method``, whatever the type of the context."""
+
+        if self.allow is not None and method not in self._allowed and \
+               not any(self._controllers.values()):
+            raise MethodNotAllowed(self.allow)
 
     def path(self, context=None, **matchdict):
         """Generate route path. When traversal is used, ``context``
@@ -118,7 +584,53 @@ class Dispatcher(Route):
             path = reverse(context)
             matchdict[''] = path
 
-        return super(Dispatcher, self).path(**matchdict)
+        return self._prefix + super(Dispatcher, self).path(**matchdict)
+
+    def url(self, context=None, host=None, scheme='http', **matchdict):
+        """Generate URL, i.e. the route path prefixed by the scheme
+        and the host of the route. The ``host`` argument is required
+        if the route belongs to a wildcard host (or no host)."""
+
+        if host is None:
+            host = self.host
+            if host is None or host.startswith('*'):
+                raise TypeError("Route %r requires a host." % self._path)
+
+        return "%s://%s%s" % (scheme, host, self.path(context, **matchdict))
+
+    def path_many(self, items, **matchdict):
+        """Generate a list of paths.
+
+        If the route uses object mapping, ``items`` is an iterable of
+        contexts; the mapper is instantiated once for all of them and
+        ``**matchdict`` provides the remaining arguments. Otherwise,
+        ``items`` is an iterable of match dictionaries.
+        """
+
+        if not self._mapping:
+            paths = super(Dispatcher, self).path_many(items)
+        else:
+            paths = self._reverse_many(items, matchdict)
+
+        prefix = self._prefix
+        if prefix:
+            return [prefix + path for path in paths]
+        return paths
+
+    def _reverse_many(self, items, matchdict):
+        try:
+            reverse = self._mapper().reverse
+        except AttributeError: # pragma no cover
+            raise NotImplementedError(
+                "Unable to generate paths using %s." % repr(self._mapper))
+
+        matchdicts = []
+        for context in items:
+            d = dict(matchdict)
+            d[''] = reverse(context)
+            matchdicts.append(d)
+
+        return super(Dispatcher, self).path_many(matchdicts)
 
     def resolve(self, path, **matchdict):
         try:
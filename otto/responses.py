@@ -0,0 +1,183 @@
+"""Response cache.
+
+Responses to ``GET`` requests can be cached for each route (see
+:meth:`otto.publisher.Dispatcher.cached`)::
+
+  @app.connect('/articles/:name').cached(ttl=60, vary=('Accept-Language', ))
+  def article(request, name):
+      ...
+
+Entries are keyed on the match dictionary, the query string and the
+headers given by ``vary``. A cached response is returned without
+resolving the context or calling the controller; it carries a strong
+``ETag`` such that clients which send ``If-None-Match`` receive
+``304 Not Modified``.
+
+Only complete ``200 OK`` responses which don't set a cookie and which
+are not marked as ``private`` or ``no-store`` are cached; a response
+whose ``Vary`` header names a request header which is not part of the
+key is not cached either. Requests which carry ``Authorization`` are
+neither answered from the cache nor do they populate it. ``HEAD``
+requests are answered from the cache, but don't populate it.
+"""
+
+import hashlib
+
+from otto.cache import TTLCache
+
+# headers included in a ``304 Not Modified`` response
+not_modified_headers = frozenset((
+    'cache-control', 'content-location', 'date', 'etag', 'expires',
+    'last-modified', 'vary'))
+
+
+class CachedResponse(object):
+    """WSGI response with a body."""
+
+    def __init__(self, status, headerlist, body, etag=None):
+        self.status = status
+        self.status_int = int(status[:3])
+        self.headerlist = headerlist
+        self.body = body
+        self.etag = etag
+        self.not_modified = None
+
+    def __call__(self, environ, start_response):
+        start_response(self.status, list(self.headerlist))
+        if environ.get('REQUEST_METHOD') == 'HEAD':
+            return []
+        return [self.body]
+
+    def conditional(self, environ):
+        """Return ``304 Not Modified`` response if the client has a
+        current copy (per ``If-None-Match``), otherwise this
+        response."""
+
+        header = environ.get('HTTP_IF_NONE_MATCH')
+        if header is not None and self.not_modified is not None and \
+               matches(header, self.etag):
+            return self.not_modified
+        return self
+
+
+class ResponseCache(TTLCache):
+    """Bounded cache of the responses of a route.
+
+    Up to ``maxsize`` responses are kept for ``ttl`` seconds; the
+    least recently used response is evicted first. The ``vary``
+    argument is a sequence of request header names whose values are
+    part of the key.
+    """
+
+    def __init__(self, maxsize=1024, ttl=60, vary=()):
+        super(ResponseCache, self).__init__(maxsize, ttl)
+        self.vary = tuple(vary)
+        self._environ_keys = tuple(
+            'HTTP_' + name.upper().replace('-', '_') for name in self.vary)
+        self._varying = frozenset(name.lower() for name in self.vary)
+
+    def key(self, matchdict, environ):
+        """Return key for the request or ``None`` if the request
+        method is not ``GET`` or ``HEAD`` or the request carries
+        credentials (``Authorization``)."""
+
+        method = environ.get('REQUEST_METHOD', 'GET')
+        if method != 'GET' and method != 'HEAD' or \
+               'HTTP_AUTHORIZATION' in environ:
+            return
+
+        return (
+            tuple(sorted(matchdict.items())),
+            environ.get('QUERY_STRING', ''),
+            tuple(environ.get(key) for key in self._environ_keys))
+
+    def store(self, key, response, environ):
+        """Cache ``response`` if possible and return the response for
+        the request; the ``ETag`` (and ``Vary``) headers are added to
+        ``response``."""
+
+        if environ.get('REQUEST_METHOD', 'GET') != 'GET' or \
+               getattr(response, 'status_int', 0) != 200:
+            return response
+
+        headerlist = getattr(response, 'headerlist', None)
+        if headerlist is None:
+            return response
+
+        etag = None
+        names = set()
+        for name, value in headerlist:
+            name = name.lower()
+            if name == 'set-cookie':
+                return response
+            if name == 'cache-control' and (
+                'private' in value or 'no-store' in value):
+                return response
+            if name == 'vary':
+                for header in value.split(','):
+                    if header.strip().lower() not in self._varying:
+                        return response
+            if name == 'etag':
+                etag = value
+            names.add(name)
+
+        body = response.body
+        if etag is None:
+            etag = '"%s"' % hashlib.sha1(body).hexdigest()
+            headerlist.append(('ETag', etag))
+        if self.vary and 'vary' not in names:
+            headerlist.append(('Vary', ', '.join(self.vary)))
+
+        entry = CachedResponse(response.status, list(headerlist), body, etag)
+        if not etag.startswith('W/'):
+            entry.not_modified = CachedResponse(
+                '304 Not Modified', [
+                    (name, value) for name, value in headerlist
+                    if name.lower() in not_modified_headers], b'', etag)
+
+        self[key] = entry
+        if entry.conditional(environ) is entry:
+            return response
+        return entry.not_modified
+
+    def invalidate(self, **matchdict):
+        """Remove the responses whose match dictionary includes the
+        given values; without arguments, remove all responses. Return
+        the number of responses removed."""
+
+        if not matchdict:
+            count = len(self)
+            self.clear()
+            return count
+
+        items = set(matchdict.items())
+        count = 0
+        for key in self.keys():
+            if items.issubset(key[0]):
+                self.pop(key)
+                count += 1
+        return count
+
+
+def matches(header, etag):
+    """Return true if the ``If-None-Match`` header matches ``etag``
+    (using the weak comparison).
+
+    >>> matches('"a", W/"b"', '"b"')
+    True
+    >>> matches('*', '"b"')
+    True
+    >>> matches('"a"', '"b"')
+    False
+    """
+
+    header = header.strip()
+    if header == '*':
+        return True
+    for tag in header.split(','):
+        tag = tag.strip()
+        if tag.startswith('W/'):
+            tag = tag[2:]
+        if tag == etag:
+            return True
+    return False
@@ -1,5 +1,6 @@
 import re
 import operator
+import threading
 
 try:
     from urllib import unquote as _unquote
@@ -7,12 +8,19 @@ try:
     def unquote(s):
         return _unquote(s).decode('utf-8')
 
+    # byte strings must always be decoded (the empty string is
+    # contained in every string)
+    escape = ''
+
 except ImportError:
     from urllib.parse import unquote
 
+    escape = '%'
+
     basestring = str
     unicode = None
 
+from otto import precompiled
 from otto.utils import quote_path_segment
 from otto.utils import url_quote
 
@@ -38,6 +46,10 @@ except ImportError: # pragma no cover
 
 re_segment = re.compile(r':([a-z]+)')
 re_stararg = re.compile(r'(?<!\\)\*(?P<name>[A-Za-z_]*)')
+re_literal = re.compile(r"^[\w\-~,;=@!&'%]*$", re.UNICODE)
+re_name = re.compile(r'^:[a-z]+$')
+re_group = re.compile(r'\(\?P<\w+>')
+re_token = re.compile(r':(?P<key>[a-z]+)|(?<!\\)\*(?P<star>[A-Za-z_]*)')
 
 def matcher(path):
     """Compile match function for ``path``.
@@ -94,10 +106,79 @@ def matcher(path):
     True
     """.replace("u'", "'" if unicode is None else "u'")
 
+    expression, name = translate(path)
+    match = precompiled.compile("^%s$" % expression).match
+
+    def match(path, match=match, name=name):
+        m = match(path)
+        if m is None:
+            return
+        return decode(m.groupdict(), name)
+
+    return match
+
+def slash_matcher(path):
+    """Compile slash-aware match function for ``path``.
+
+    The function returns the match dictionary if the path matches
+    the route; if instead the path matches with the trailing slash
+    toggled (see :func:`toggle`), it returns ``True``.
+
+    >>> match = slash_matcher('/docs/')
+    >>> match('/docs/'), match('/docs'), match('/docs//'), match('/doc')
+    ({}, True, None, None)
+
+    >>> match = slash_matcher('/:name')
+    >>> match('/foo///'), match('/foo/bar/')
+    (True, None)
+
+    >>> match = slash_matcher('/docs/*')
+    >>> match('/docs/math/pi/')
+    {'': (u'math', u'pi')}
+    """.replace("u'", "'" if unicode is None else "u'")
+
+    expression, name = translate(path)
+
+    # an alternation applies to the anchors of the expression; we
+    # fall back to matching twice
+    if '|' in expression:
+        match = matcher(path)
+
+        def match_slash(path):
+            m = match(path)
+            if m is None and match(toggle(path)) is not None:
+                return True
+            return m
+
+        return match_slash
+
+    # the path is matched with a slash appended; the exact path is
+    # tried first, then the path with a slash added, and finally the
+    # path with trailing slashes removed
+    plain = re_group.sub('(?:', expression)
+    match = precompiled.compile(
+        "^(?:(?:%s)(?P<_exact>/)$|(?:%s)(?<!//)$|(?:%s)(?<!/)//+$)" % (
+            expression, plain, plain)).match
+
+    def match_slash(path, match=match, name=name):
+        m = match(path + '/')
+        if m is None:
+            return
+        d = m.groupdict()
+        if d.pop('_exact') is None:
+            return True
+        return decode(d, name)
+
+    return match_slash
+
+def translate(path):
+    """Return regular expression and asterisk name for ``path``."""
+
     if not path.startswith('/'):
         path = '(?:/)' + path
 
     # setup star match
+    name = None
     star = re_stararg.search(path)
     if star is not None:
         name = star.group('name')
@@ -108,25 +189,31 @@ def matcher(path):
 
     # unescape star-escape
     expression = re.sub(r'\\\*', '*', expression)
-    match = re.compile("^%s$" % expression).match
+    return expression, name
 
-    if star is None:
-        name = None
+def decode(groups, name):
+    """Return match dictionary for regular expression ``groups``."""
 
-    def match(path, match=match, name=name, unquote=unquote):
-        m = match(path)
-        if m is None:
-            return
-        d = {}
-        for k, v in iteritems(m.groupdict()):
+    d = {}
+    for k, v in iteritems(groups):
+        if escape in v:
             v = unquote(v)
-            if k == '_star':
-                k = name
-                v = tuple(s for s in v.split('/') if s)
-            d[k] = v
-        return d
+        if k == '_star':
+            k = name
+            v = tuple(filter(None, v.split('/')))
+        d[k] = v
+    return d
 
-    return match
+def toggle(path):
+    """Return ``path`` with the trailing slash toggled.
+
+    >>> toggle('/docs'), toggle('/docs//')
+    ('/docs/', '/docs')
+    """
+
+    if path.endswith('/'):
+        return path.rstrip('/')
+    return path + '/'
 
 def generator(path):
     """Compile generate function for ``path``.
@@ -156,49 +243,357 @@ def generator(path):
     '/docs/some/name'
     """
 
-    expression = re.sub(r':([a-z]+)', '%(\\1)s', path)
-    trailing = path.endswith('/')
-
-    star = re_stararg.search(expression)
-    if star is not None:
-        start = star.start() - 1
-        if start > 0 and expression[start] != '/':
-            expression = expression[:start + 1] + '/' + expression[start + 1:]
-
-        name = star.group('name') or ''
-        expression = re_stararg.sub('%%(%s)s' % name, expression)
-    else:
-        name = None
+    parts, slots, strip = template(path)
+    count = len(slots)
 
     def generate(kw):
-        d = {}
-        for key, value in kw.items():
-            if key == name:
-                if isinstance(value, basestring):
-                    value = url_quote(value.strip('/'), '/')
+        if len(kw) != count:
+            check(path, slots, kw)
+
+        parts_ = list(parts)
+        try:
+            for index, key, star in slots:
+                value = kw[key]
+                if star:
+                    if isinstance(value, basestring):
+                        value = url_quote(value.strip('/'), '/')
+                    else:
+                        value = "/".join(map(quote_path_segment, value))
                 else:
-                    quote = quote_path_segment
-                    value = "/".join(map(quote_path_segment, value))
+                    cls = value.__class__
+                    if cls is str:
+                        value = url_quote(value)
+                    elif cls is unicode:
+                        value = url_quote(value.encode('utf-8'))
+                    else:
+                        value = '%s' % (value, )
+                parts_[index] = value
+        except KeyError:
+            check(path, slots, kw)
+            raise
+
+        if strip:
+            return "".join(parts_).rstrip('/')
+        return "".join(parts_)
+
+    def generate_many(kws):
+        quoted = {}, {}
+        paths = []
+        for kw in kws:
+            if len(kw) != count:
+                check(path, slots, kw)
+
+            parts_ = list(parts)
+            try:
+                for index, key, star in slots:
+                    value = kw[key]
+
+                    # only strings and tuples are memoized; other
+                    # values may compare equal across types
+                    cls = value.__class__
+                    if cls is str or cls is tuple or cls is unicode:
+                        memo = quoted[star]
+                        result = memo.get(value)
+                        if result is not None:
+                            parts_[index] = result
+                            continue
+                    else:
+                        memo = None
+
+                    if star:
+                        if isinstance(value, basestring):
+                            result = url_quote(value.strip('/'), '/')
+                        else:
+                            result = "/".join(map(quote_path_segment, value))
+                    elif cls is str:
+                        result = url_quote(value)
+                    elif cls is unicode:
+                        result = url_quote(value.encode('utf-8'))
+                    else:
+                        result = '%s' % (value, )
+
+                    if memo is not None:
+                        memo[value] = result
+                    parts_[index] = result
+            except KeyError:
+                check(path, slots, kw)
+                raise
+
+            if strip:
+                paths.append("".join(parts_).rstrip('/'))
             else:
-                cls = value.__class__
-                if cls is unicode:
-                    value = url_quote(value.encode('utf-8'))
-                elif cls is str:
-                    value = url_quote(value)
-            d[key] = value
-        path = expression % d
-        if trailing is False:
-            return path.rstrip('/')
-        return path
+                paths.append("".join(parts_))
+
+        return paths
+
+    generate.many = generate_many
     return generate
 
+def template(path):
+    """Compile path template for ``path``.
+
+    Returns a list of literal parts where the slots are ``None``, a
+    tuple of slots ``(index, key, star)`` and whether trailing slashes
+    must be stripped from the generated path.
+
+    >>> template('/docs/*/:name')
+    (['/docs/', None, '/', None], ((1, '', True), (3, 'name', False)), True)
+
+    >>> template('/:foo*bar/')
+    (['/', None, '/', None, '/'], ((1, 'foo', False), (3, 'bar', True)), False)
+    """
+
+    parts = []
+    slots = []
+    length = 0
+    star = None
+    pos = 0
+
+    for m in re_token.finditer(path):
+        literal = path[pos:m.start()]
+        if literal:
+            parts.append(literal)
+            length += len(literal)
+        pos = m.end()
+
+        key = m.group('key')
+        if key is None:
+            if star is None:
+                # the asterisk must follow a path separator
+                star = m.group('star') or ''
+                if length > 1 and (not parts or parts[-1] is None or
+                                   not parts[-1].endswith('/')):
+                    parts.append('/')
+            slots.append((len(parts), star, True))
+            length += 2
+        else:
+            slots.append((len(parts), key, False))
+            length += 5
+        parts.append(None)
+
+    if pos < len(path):
+        parts.append(path[pos:])
+
+    strip = not path.endswith('/') and bool(parts) and parts[-1] is None
+    return parts, tuple(slots), strip
+
+def check(path, slots, kw):
+    """Raise ``TypeError`` if ``kw`` does not match ``slots``.
+
+    >>> check('/:a/:b', ((0, 'a', False), (1, 'b', False)), {'c': 1})
+    Traceback (most recent call last):
+     ...
+    TypeError: Route '/:a/:b' missing: 'a', 'b'; unexpected: 'c'.
+    """
+
+    keys = set(key for index, key, star in slots)
+    missing = sorted(keys.difference(kw))
+    extra = sorted(set(kw).difference(keys))
+    if not missing and not extra:
+        return
+
+    errors = []
+    if missing:
+        errors.append("missing: %s" % ", ".join(map(repr, missing)))
+    if extra:
+        errors.append("unexpected: %s" % ", ".join(map(repr, extra)))
+    raise TypeError("Route %r %s." % (path, "; ".join(errors)))
+
+def segments(path):
+    """Return the leading literal and ``:key`` segments of ``path``.
+
+    The second value is true if these segments cover the entire
+    route; otherwise, the remainder of the route is an expression
+    (e.g. an asterisk) which only the route itself can match.
+
+    >>> segments('/a/:b/c')
+    (['a', ':b', 'c'], True)
+
+    >>> segments('static*subpath')
+    ([], False)
+
+    >>> segments('/docs/*/:name')
+    (['docs'], False)
+
+    A quantifier applies to the separator which comes before it:
+
+    >>> segments('/docs/?:name')
+    ([], False)
+
+    >>> segments('/docs/\\\\*name')
+    ([], False)
+    """
+
+    if '|' in path:
+        return [], False
+
+    if not path.startswith('/'):
+        path = '/' + path
+
+    result = []
+    for part in path[1:].split('/'):
+        if re_literal.match(part) is None and re_name.match(part) is None:
+            if (part[:1] in ('?', '+', '{') or part[:2] == '\\*') \
+                   and result:
+                result.pop()
+            return result, False
+        result.append(part)
+
+    return result, True
+
+def shape(path):
+    """Return the segments of ``path`` and a flag which is true if
+    the route ends with an asterisk, or ``None`` if the route is not
+    made up of literal and ``:key`` segments (and a final asterisk).
+
+    >>> shape('/a/:b')
+    (['a', ':b'], False)
+
+    >>> shape('/docs/*path')
+    (['docs'], True)
+
+    >>> shape('/docs/*/:name') is None
+    True
+    """
+
+    parts, complete = segments(path)
+    if complete:
+        return parts, False
+
+    if '|' in path:
+        return None
+
+    if not path.startswith('/'):
+        path = '/' + path
+
+    prefix = '/'.join([''] + parts)
+    m = re_stararg.match(path, len(prefix) + 1)
+    if path[len(prefix):len(prefix) + 1] == '/' and m is not None and \
+           m.end() == len(path):
+        return parts, True
+
+def compatible(a, b):
+    # some segment is matched by both parts
+    return a == b or a[:1] == ':' or b[:1] == ':'
+
+def overlaps(a, b):
+    """Return true if some path is matched by both route shapes."""
+
+    (p, star), (q, other) = a, b
+    if not star and not other and len(p) != len(q):
+        return False
+    if not star and other and len(p) <= len(q):
+        return False
+    if star and not other and len(q) <= len(p):
+        return False
+
+    for x, y in zip(p, q):
+        if not compatible(x, y):
+            return False
+    return True
+
+def covers(a, b):
+    """Return true if every path matched by route shape ``b`` is
+    matched by ``a``.
+
+    >>> covers(shape('/:name'), shape('/about'))
+    True
+
+    >>> covers(shape('/docs/*'), shape('/docs/:name'))
+    True
+
+    >>> covers(shape('/docs/:name'), shape('/docs/*'))
+    False
+    """
+
+    (p, star), (q, other) = a, b
+    if star:
+        if len(p) > len(q) or (len(p) == len(q) and not other):
+            return False
+    elif other or len(p) != len(q):
+        return False
+
+    for x, y in zip(p, q):
+        if x[:1] != ':' and x != y:
+            return False
+    return True
+
+def analyze(routes):
+    """Return the shadowed routes and the precedence relationships of
+    the routing table ``routes``.
+
+    The first value is a list of ``(route, by)`` tuples where ``by``
+    is an earlier route which matches every path that ``route``
+    matches. The second is a dictionary which maps each route to the
+    tuple of earlier routes that may match the same paths (those that
+    a different engine must try first).
+
+    Only routes which consist of literal and ``:key`` segments (and a
+    final asterisk) are analyzed; other routes are assumed to overlap
+    with any route and are never reported as shadowed.
+
+    >>> routes = [Route('/:name'), Route('/about'), Route('/a/b')]
+    >>> shadowed, precedence = analyze(routes)
+    >>> shadowed
+    [(<Route path="/about">, <Route path="/:name">)]
+    >>> precedence[routes[2]]
+    ()
+    """
+
+    shapes = [shape(getattr(route, '_path', '|')) for route in routes]
+    buckets = {}
+    wild = []
+    shadowed = []
+    precedence = {}
+
+    for j, b in enumerate(shapes):
+        # routes with a common literal first segment (or a wildcard)
+        key = b is not None and b[0] and b[0][0][:1] != ':' and b[0][0]
+        if key:
+            candidates = sorted(buckets.get(key, []) + wild)
+        else:
+            candidates = range(j)
+
+        earlier = []
+        found = None
+        for i in candidates:
+            a = shapes[i]
+            if a is None or b is None:
+                earlier.append(routes[i])
+            elif overlaps(a, b):
+                earlier.append(routes[i])
+                if found is None and covers(a, b):
+                    found = routes[i]
+
+        if found is not None:
+            shadowed.append((routes[j], found))
+        precedence[routes[j]] = tuple(earlier)
+
+        if key:
+            buckets.setdefault(key, []).append(j)
+        else:
+            wild.append(j)
+
+    return shadowed, precedence
+
 class Route(object):
-    def __init__(self, path):
-        """Create route given by ``path``."""
+    def __init__(self, path, lazy=False):
+        """Create route given by ``path``; if ``lazy`` is set, the
+        match and generate functions are compiled on first use."""
 
         self._path = path
-        self._generate = generator(path)
-        self.match = matcher(path)
+        if not lazy:
+            self._generate = generator(path)
+            self.match = matcher(path)
+            self.match_slash = slash_matcher(path)
+
+    def __getattr__(self, name):
+        compile = _compilers.get(name)
+        if compile is None:
+            raise AttributeError(name)
+        value = compile(self._path)
+        setattr(self, name, value)
+        return value
 
     def __repr__(self):
         return '<%s path="%s">' % (self.__class__.__name__, self._path)
@@ -208,11 +603,37 @@ class Route(object):
 
         return self._generate(matchdict)
 
+    def path_many(self, matchdicts):
+        """Generate a list of paths given an iterable of match
+        dictionaries.
+
+        Each distinct value is quoted only once.
+        """
+
+        return self._generate.many(matchdicts)
+
+# functions which compile the attributes of a lazy route
+_compilers = {
+    '_generate': generator,
+    'match': matcher,
+    'match_slash': slash_matcher,
+    }
+
 class Router(object):
-    """Interface to the routing engine."""
+    """Interface to the routing engine.
+
+    Routes are added and removed using :meth:`connect`,
+    :meth:`disconnect` and :meth:`replace`. Writers are serialized
+    using a lock while lookups take no lock at all: a route is added
+    by appending it to the table (which is atomic), other changes
+    build a new table which is then swapped in. A lookup therefore
+    always sees the table either before or after a change.
+    """
 
     def __init__(self):
         self._routes = []
+        self._lock = threading.Lock()
+        self._version = 0
 
     def __call__(self, path):
         """Returns an iterator which yields route matches."""
@@ -225,4 +646,403 @@ class Router(object):
     def connect(self, route):
         """Use this method to add routes."""
 
+        with self._lock:
+            self._add(route)
+            self._version += 1
+
+    def disconnect(self, route):
+        """Remove ``route``; raises ``ValueError`` if the route is not
+        connected."""
+
+        with self._lock:
+            for index, other in enumerate(self._routes):
+                if other is route:
+                    break
+            else:
+                raise ValueError("Route %r is not connected." % (route, ))
+            self._remove(route, index)
+            self._version += 1
+
+    def replace(self, routes):
+        """Replace all routes with ``routes`` and return the previous
+        routes."""
+
+        with self._lock:
+            previous = self._routes
+            self._reset(list(routes))
+            self._version += 1
+        return previous
+
+    def _add(self, route):
         self._routes.append(route)
+
+    def _remove(self, route, index):
+        routes = list(self._routes)
+        del routes[index]
+        self._routes = routes
+
+    def _reset(self, routes):
+        self._routes = routes
+
+    def match(self, path):
+        """Return the first route match or ``None``."""
+
+        for route in self._routes:
+            m = route.match(path)
+            if m is not None:
+                return Match(route, m)
+
+    def search(self, path):
+        """Return tuple of route match and redirect path.
+
+        If no route matches ``path``, but one matches the path with
+        the trailing slash toggled, the latter is returned as the
+        redirect path. Each route is tried only once.
+        """
+
+        redirect = None
+        for route in self._routes:
+            m = route.match_slash(path)
+            if m is None:
+                continue
+            if m is True:
+                if redirect is None:
+                    redirect = toggle(path)
+                continue
+            return Match(route, m), None
+        return None, redirect
+
+class Node(object):
+    """Segment tree node.
+
+    A change to a tree which is in use is made visible by a single
+    assignment (see :func:`insert` and :func:`remove`).
+    """
+
+    __slots__ = ('children', 'wildcard', 'routes', 'fallback')
+
+    def __init__(self):
+        self.children = {}
+        self.wildcard = None
+        self.routes = ()
+        self.fallback = ()
+
+    def empty(self):
+        return not (self.children or self.wildcard or self.routes or
+                    self.fallback)
+
+class TreeRouter(Router):
+    """Routing engine which indexes routes by path segment.
+
+    Literal segments are edges in a prefix tree while ``:key``
+    segments share a single wildcard edge. Routes which use an
+    asterisk or a regular expression are indexed by their literal
+    prefix and matched by the route itself.
+
+    Matches are yielded in the order the routes were connected, just
+    like with :class:`Router`. Adding or removing a route changes
+    only the nodes on its path.
+    """
+
+    def __init__(self):
+        super(TreeRouter, self).__init__()
+        self._count = 0
+
+        # tuple of the tree and the list of indexed routes
+        self._index = Node(), []
+
+    def __call__(self, path):
+        """Returns an iterator which yields route matches."""
+
+        for index, route in self._candidates(path, self._index):
+            m = route.match(path)
+            if m is not None:
+                yield Match(route, m)
+
+    def match(self, path):
+        """Return the first route match or ``None``."""
+
+        for index, route in self._candidates(path, self._index):
+            m = route.match(path)
+            if m is not None:
+                return Match(route, m)
+
+    def search(self, path):
+        """Return tuple of route match and redirect path."""
+
+        table = self._index
+        redirect = toggle(path)
+        candidates = dict(self._candidates(path, table))
+        candidates.update(self._candidates(redirect, table))
+
+        found = False
+        for index in sorted(candidates):
+            route = candidates[index]
+            m = route.match_slash(path)
+            if m is None:
+                continue
+            if m is True:
+                found = True
+                continue
+            return Match(route, m), None
+
+        if found:
+            return None, redirect
+        return None, None
+
+    def _add(self, route):
+        entry = self._count, route
+        self._count += 1
+        root, entries = self._index
+        insert(root, route_segments(route), entry)
+        entries.append(entry)
+        self._routes.append(route)
+
+    def _remove(self, route, index):
+        root, entries = self._index
+        entry = entries[index]
+        remove(root, route_segments(route), entry)
+        entries = list(entries)
+        del entries[index]
+        self._index = root, entries
+        super(TreeRouter, self)._remove(route, index)
+
+    def _reset(self, routes):
+        root = Node()
+        entries = list(enumerate(routes, self._count))
+        self._count += len(routes)
+        for entry in entries:
+            insert(root, route_segments(entry[1]), entry)
+        self._index = root, entries
+        self._routes = routes
+
+    def _candidates(self, path, table):
+        root, entries = table
+        if not path.startswith('/'):
+            return list(entries)
+
+        parts = path[1:].split('/')
+        found = []
+        collect(root, parts, 0, len(parts), found)
+        found.sort(key=operator.itemgetter(0))
+        return found
+
+def route_segments(route):
+    """Return tuple of the segments of the route path and whether the
+    route is matched by these alone (see :func:`segments`)."""
+
+    path = getattr(route, '_path', None)
+    if path is None:
+        return (), False
+    return segments(path)
+
+def insert(node, key, entry):
+    """Add ``entry`` to the tree ``node`` at ``key`` (a tuple of path
+    segments and completeness).
+
+    Missing nodes are created outside of the tree and then attached
+    to it, such that the change is made by a single assignment.
+    """
+
+    parts, complete = key
+    attach = None
+    for part in parts:
+        if part[:1] == ':':
+            child = node.wildcard
+            if child is None:
+                child = Node()
+                if attach is None:
+                    attach = node, None, child
+                else:
+                    node.wildcard = child
+        else:
+            child = node.children.get(part)
+            if child is None:
+                child = Node()
+                if attach is None:
+                    attach = node, part, child
+                else:
+                    node.children[part] = child
+        node = child
+
+    if complete:
+        node.routes += (entry, )
+    else:
+        node.fallback += (entry, )
+
+    if attach is not None:
+        parent, part, child = attach
+        if part is None:
+            parent.wildcard = child
+        else:
+            parent.children[part] = child
+
+def remove(node, key, entry):
+    """Remove ``entry`` from the tree ``node`` at ``key``; nodes which
+    are then empty are removed too."""
+
+    parts, complete = key
+    path = []
+    for part in parts:
+        path.append((node, part))
+        if part[:1] == ':':
+            node = node.wildcard
+        else:
+            node = node.children[part]
+
+    if complete:
+        node.routes = tuple(e for e in node.routes if e is not entry)
+    else:
+        node.fallback = tuple(e for e in node.fallback if e is not entry)
+
+    while path and node.empty():
+        node, part = path.pop()
+        if part[:1] == ':':
+            node.wildcard = None
+        else:
+            del node.children[part]
+
+def collect(node, parts, i, length, found):
+    """Collect routes from ``node`` which may match ``parts[i:]``."""
+
+    if node.fallback:
+        found.extend(node.fallback)
+
+    if i == length:
+        found.extend(node.routes)
+        return
+
+    child = node.children.get(parts[i])
+    if child is not None:
+        collect(child, parts, i + 1, length, found)
+
+    if node.wildcard is not None:
+        collect(node.wildcard, parts, i + 1, length, found)
+
+class CompiledRouter(Router):
+    """Routing engine which compiles the routing table into a single
+    function.
+
+    Routes which consist of literal and ``:key`` segments only are
+    matched inline against the split path; the remaining routes are
+    guarded by a check on their literal segments. The function is
+    generated again on first use after the routing table has changed;
+    once compiled, the ``source`` attribute holds its source code.
+    """
+
+    source = None
+
+    def __init__(self):
+        super(CompiledRouter, self).__init__()
+
+        # tuple of the table version and its match functions
+        self._compiled = None
+
+    def match(self, path):
+        """Return the first route match or ``None``."""
+
+        compiled = self._compiled
+        if compiled is None or compiled[0] != self._version:
+            compiled = self.compile()
+        return compiled[1](path)
+
+    def search(self, path):
+        """Return tuple of route match and redirect path."""
+
+        compiled = self._compiled
+        if compiled is None or compiled[0] != self._version:
+            compiled = self.compile()
+        return compiled[2](path)
+
+    def compile(self):
+        """Generate match functions for the current routing table."""
+
+        # the version is read first; if the table changes while it's
+        # compiled, the functions are generated again on next use
+        version = self._version
+        routes = list(self._routes)
+
+        split = [
+            "    if path[:1] == '/':",
+            "        s = path[1:].split('/')",
+            "        n = len(s)",
+            "    else:",
+            "        n = -1",
+            ]
+
+        match = ["def match(path):"] + split
+        search = ["def search(path):"] + split
+        toggled = [
+            "    t = toggle(path)",
+            "    if t[:1] == '/':",
+            "        u = t[1:].split('/')",
+            "        k = len(u)",
+            "    else:",
+            "        k = -1",
+            ]
+
+        namespace = {'Match': Match, 'unquote': unquote, 'toggle': toggle}
+
+        for index, route in enumerate(routes):
+            path = getattr(route, '_path', None)
+            parts, complete = route_segments(route)
+
+            r = 'r%d' % index
+            m = 'm%d' % index
+            namespace[r] = route
+
+            # routes which are matched inline are never compiled if
+            # they're lazy
+            if not complete:
+                namespace[m] = route.match
+
+            for lines in (match, search, toggled):
+                lines.append("    # %r" % (path, ))
+
+            emit(match, parts, complete, m, 's', 'n', 'path',
+                 lambda d: "return Match(%s, %s)" % (r, d))
+            emit(search, parts, complete, m, 's', 'n', 'path',
+                 lambda d: "return Match(%s, %s), None" % (r, d))
+            emit(toggled, parts, complete, m, 'u', 'k', 't',
+                 lambda d: "return None, t")
+
+        search.extend(toggled)
+        search.append("    return None, None")
+        source = "\n".join(match + search) + "\n"
+        code = compile(source, "<otto: %s>" % type(self).__name__, "exec")
+        exec(code, namespace)
+        compiled = version, namespace['match'], namespace['search']
+        self.source = source
+        self._compiled = compiled
+        return compiled
+
+def emit(lines, parts, complete, m, s, n, subject, found):
+    """Append match statements for a route to ``lines``.
+
+    The ``found`` function is called with an expression for the match
+    dictionary and returns the statement that handles a match.
+    """
+
+    checks = ["%s %s %d" % (n, complete and '==' or '>=', len(parts))]
+    names = []
+    for i, part in enumerate(parts):
+        if part[:1] == ':':
+            v = "%s[%d]" % (s, i)
+            names.append("%r: (unquote(%s) if %r in %s else %s)" % (
+                part[1:], v, escape, v, v) if escape else
+                "%r: unquote(%s)" % (part[1:], v))
+        else:
+            checks.append("%s[%d] == %r" % (s, i, part))
+
+    if complete:
+        lines.append("    if %s:" % " and ".join(checks))
+        lines.append("        " + found("{%s}" % ", ".join(names)))
+        return
+
+    indent = "    "
+    if parts:
+        lines.append("    if %s:" % " and ".join(checks))
+        indent += "    "
+    lines.append("%sm = %s(%s)" % (indent, m, subject))
+    lines.append("%sif m is not None:" % indent)
+    lines.append("%s    %s" % (indent, found("m")))
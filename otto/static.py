@@ -0,0 +1,285 @@
+"""Static files.
+
+The :class:`Static` controller serves the files in a directory using
+a route which ends with a named asterisk::
+
+  app.connect('/static/*subpath', controller=Static('/var/www/static'))
+
+File metadata (and the result of resolving a path) is cached for a
+short time, such that conditional requests are answered without
+accessing the file system. Files are sent using the server's
+``wsgi.file_wrapper`` if available (which may use ``sendfile``);
+otherwise, they're read in chunks from a memory map.
+"""
+
+import mimetypes
+import mmap
+import os
+
+from email.utils import formatdate
+from email.utils import mktime_tz
+from email.utils import parsedate_tz
+
+from webob.exc import HTTPMethodNotAllowed
+from webob.exc import HTTPNotFound
+from otto.cache import TTLCache
+
+_marker = object()
+
+
+class Static(object):
+    """Controller which serves the files below ``root``.
+
+    The route must end with an asterisk named ``name``. Metadata is
+    cached for up to ``size`` paths for ``ttl`` seconds; files are
+    sent in chunks of ``chunk_size`` bytes. If ``cache_control`` is
+    given, it's used as the value of the ``Cache-Control`` header.
+    """
+
+    takes_environ = True
+
+    def __init__(self, root, name='subpath', ttl=1.0, size=1024,
+                 chunk_size=65536, cache_control=None):
+        self.root = os.path.realpath(root)
+        self.name = name
+        self.chunk_size = chunk_size
+        self.cache_control = cache_control
+        self._files = TTLCache(size, ttl)
+
+    def __call__(self, environ, **matchdict):
+        method = environ['REQUEST_METHOD']
+        if method != 'GET' and method != 'HEAD':
+            raise HTTPMethodNotAllowed(headers=[('Allow', 'GET, HEAD')])
+
+        segments = matchdict[self.name]
+        entry = self._files.get(segments, _marker)
+        if entry is _marker:
+            entry = self._files[segments] = self.stat(segments)
+        if entry is None:
+            raise HTTPNotFound("File not found.")
+
+        filename, size, mtime, etag, headers = entry
+
+        if not_modified(environ, etag, mtime):
+            return Response('304 Not Modified', list(headers))
+
+        offset, length = 0, size
+        status = '200 OK'
+        header = environ.get('HTTP_RANGE')
+        if header is not None and if_range(environ, etag, mtime):
+            byte_range = parse_range(header, size)
+            if byte_range is False:
+                return Response(
+                    '416 Requested Range Not Satisfiable',
+                    [('Content-Range', 'bytes */%d' % size),
+                     ('Content-Length', '0')])
+            if byte_range is not None:
+                offset, length = byte_range
+                status = '206 Partial Content'
+
+        headers = list(headers)
+        headers.append(('Content-Length', str(length)))
+        if status[0] == '2' and length != size:
+            headers.append(('Content-Range', 'bytes %d-%d/%d' % (
+                offset, offset + length - 1, size)))
+
+        return FileResponse(
+            status, headers, filename, offset, length, size,
+            self.chunk_size)
+
+    def stat(self, segments):
+        """Return metadata for the file given by the path segments or
+        ``None`` if there's no such file."""
+
+        for segment in segments:
+            if segment in ('.', '..') or '/' in segment or \
+                   '\\' in segment or '\0' in segment or \
+                   (os.sep != '/' and os.sep in segment):
+                return
+
+        filename = os.path.realpath(os.path.join(self.root, *segments))
+        if not filename.startswith(self.root + os.sep):
+            return
+
+        try:
+            st = os.stat(filename)
+        except (IOError, OSError):
+            return
+
+        if not os.path.isfile(filename):
+            return
+
+        content_type, encoding = mimetypes.guess_type(filename)
+        headers = [
+            ('Content-Type', content_type or 'application/octet-stream'),
+            ('Accept-Ranges', 'bytes'),
+            ('ETag', '"%x-%x"' % (int(st.st_mtime * 1000000), st.st_size)),
+            ('Last-Modified', formatdate(st.st_mtime, usegmt=True)),
+            ]
+        if encoding is not None:
+            headers.append(('Content-Encoding', encoding))
+        if self.cache_control is not None:
+            headers.append(('Cache-Control', self.cache_control))
+
+        return filename, st.st_size, int(st.st_mtime), headers[2][1], \
+               tuple(headers)
+
+    def clear(self):
+        """Clear the metadata cache."""
+
+        self._files.clear()
+
+
+class Response(object):
+    """WSGI response without a body."""
+
+    def __init__(self, status, headers):
+        self.status = status
+        self.status_int = int(status[:3])
+        self.headers = headers
+
+    def __call__(self, environ, start_response):
+        start_response(self.status, self.headers)
+        return []
+
+
+class FileResponse(Response):
+    """WSGI response which sends ``length`` bytes of a file from
+    ``offset``."""
+
+    def __init__(self, status, headers, filename, offset, length, size,
+                 chunk_size):
+        Response.__init__(self, status, headers)
+        self.filename = filename
+        self.offset = offset
+        self.length = length
+        self.size = size
+        self.chunk_size = chunk_size
+
+    def __call__(self, environ, start_response):
+        start_response(self.status, self.headers)
+        if environ['REQUEST_METHOD'] == 'HEAD' or not self.length:
+            return []
+
+        f = open(self.filename, 'rb')
+        wrapper = environ.get('wsgi.file_wrapper')
+        if wrapper is not None and self.length == self.size:
+            return wrapper(f, self.chunk_size)
+        return iter_file(f, self.offset, self.length, self.chunk_size)
+
+
+def iter_file(f, offset, length, chunk_size):
+    """Yield ``length`` bytes of the file ``f`` from ``offset``; the
+    file is closed when done."""
+
+    try:
+        try:
+            m = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, EnvironmentError): # pragma no cover
+            m = None
+
+        end = offset + length
+        if m is None: # pragma no cover
+            f.seek(offset)
+            while offset < end:
+                chunk = f.read(min(chunk_size, end - offset))
+                if not chunk:
+                    break
+                offset += len(chunk)
+                yield chunk
+            return
+
+        try:
+            for i in range(offset, end, chunk_size):
+                yield m[i:min(i + chunk_size, end)]
+        finally:
+            m.close()
+    finally:
+        f.close()
+
+
+def not_modified(environ, etag, mtime):
+    """Return true if the conditional request headers of ``environ``
+    indicate that the client has a current copy."""
+
+    header = environ.get('HTTP_IF_NONE_MATCH')
+    if header is not None:
+        return header.strip() == '*' or etag in [
+            tag.strip().lstrip('W/') for tag in header.split(',')]
+
+    header = environ.get('HTTP_IF_MODIFIED_SINCE')
+    if header is not None:
+        since = parse_date(header)
+        return since is not None and mtime <= since
+
+    return False
+
+
+def if_range(environ, etag, mtime):
+    """Return true if the range request applies to the current copy
+    (see the ``If-Range`` header)."""
+
+    header = environ.get('HTTP_IF_RANGE')
+    if header is None:
+        return True
+    if header.startswith('"') or header.startswith('W/'):
+        return header == etag
+    return parse_date(header) == mtime
+
+
+def parse_date(value):
+    """Return timestamp for an HTTP date or ``None``."""
+
+    parsed = parsedate_tz(value)
+    if parsed is None:
+        return
+    try:
+        return mktime_tz(parsed)
+    except (OverflowError, ValueError): # pragma no cover
+        return
+
+
+def parse_range(header, size):
+    """Return ``(offset, length)`` for a single byte range, ``None`` if
+    the header doesn't apply (it's then ignored) or ``False`` if the
+    range can't be satisfied.
+
+    >>> parse_range('bytes=0-99', 1000)
+    (0, 100)
+    >>> parse_range('bytes=900-', 1000)
+    (900, 100)
+    >>> parse_range('bytes=-100', 1000)
+    (900, 100)
+    >>> parse_range('bytes=1000-', 1000)
+    False
+    >>> parse_range('bytes=0-1,5-6', 1000) is None
+    True
+    """
+
+    unit, sep, spec = header.partition('=')
+    if unit.strip() != 'bytes' or ',' in spec:
+        return
+
+    first, sep, last = spec.strip().partition('-')
+    if not sep:
+        return
+
+    try:
+        if not first:
+            length = int(last)
+            if length <= 0:
+                return False
+            length = min(length, size)
+            return size - length, length
+
+        start = int(first)
+        end = int(last) if last else size - 1
+    except ValueError:
+        return
+
+    if start >= size:
+        return False
+    if start > end:
+        return
+    end = min(end, size - 1)
+    return start, end - start + 1
@@ -20,3 +20,416 @@ class ApplicationCase(unittest.TestCase):
         response = get_response(app, '/')
         strings = map(str, response)
         self.assertTrue('403 Forbidden' in "".join(strings))
+
+    def test_match_cache(self):
+        from otto import Application
+        from otto.tests.utils import get_response
+        app = Application(cache=2)
+        app.connect('/:name', controller=lambda request, name: None)
+        for i in range(2):
+            response = get_response(app, '/a/b')
+            self.assertTrue('404 Not Found' in str(b"".join(response)))
+        self.assertEqual(app.cache_info().hits, 1)
+        self.assertEqual(app.cache_info().currsize, 1)
+        app.connect('/:name/:id', controller=lambda request, **kw: None)
+        self.assertEqual(app.cache_info().currsize, 0)
+        self.assertEqual(app.match('/a/b').keywords, {'name': 'a', 'id': 'b'})
+
+    def test_redirect(self):
+        from otto import Application
+        from webob import Request
+        resolved = []
+        class Mapper(object):
+            def resolve(self, path):
+                resolved.append(path)
+        app = Application(Mapper)
+        app.connect('/docs/*/', controller=lambda context, request: None)
+        response = app.publish(Request.blank('/docs/a').environ)
+        self.assertEqual(response.status_int, 301)
+        self.assertEqual(response.location, 'http://localhost/docs/a/')
+        self.assertEqual(resolved, [])
+
+    def test_takes_environ(self):
+        from otto import Application
+        from otto.app import takes_environ
+        from webob import Request
+        from webob import Response
+        app = Application()
+
+        @app.connect('/health')
+        @takes_environ
+        def health(environ):
+            return Response(environ['PATH_INFO'])
+
+        response = app.publish(Request.blank('/health').environ)
+        self.assertEqual(response.body, b'/health')
+
+    def test_non_ascii_path(self):
+        from otto import Application
+        from webob import Request
+        from webob import Response
+        app = Application()
+        app.connect('/:name', controller=lambda request, name: Response(name))
+        response = app.publish(Request.blank('/caf%C3%A9').environ)
+        self.assertEqual(response.body, u'caf\xe9'.encode('utf-8'))
+
+    def test_metrics(self):
+        from otto import Application
+        from otto.metrics import Metrics
+        from webob import Request
+        from webob import Response
+        metrics = Metrics()
+        app = Application(metrics=metrics)
+        app.connect('/docs/', controller=lambda request: Response('OK'))
+        app.connect('/metrics', controller=metrics)
+        for path in ('/docs/', '/docs/', '/docs', '/missing'):
+            app.publish(Request.blank(path).environ)
+        response = app.publish(Request.blank('/metrics').environ)
+        text = response.text
+        self.assertTrue('otto_requests_total{route="/docs/"} 2\n' in text)
+        self.assertTrue(
+            'otto_responses_total{route="/docs/",code="2xx"} 2\n' in text)
+        self.assertTrue('otto_redirects_total 1\n' in text)
+        self.assertTrue('otto_not_found_total 1\n' in text)
+        self.assertTrue(
+            'otto_controller_seconds_bucket{route="/docs/",le="+Inf"} 2\n'
+            in text)
+        self.assertTrue('otto_match_seconds_count{route="/docs/"} 2\n' in text)
+
+    def test_metrics_labels(self):
+        from otto import Application
+        from otto.metrics import Metrics
+        from otto.publisher import Publisher
+        from webob import Request
+        from webob import Response
+        metrics = Metrics()
+        app = Application(metrics=metrics)
+        controller = lambda request, name: Response(name)
+        app.connect('/:name', controller=controller)
+        app.mount('/api', Publisher()).connect('/:name', controller=controller)
+        app.host('example.com').connect('/:name', controller=controller)
+
+        for path in ('/a', '/api/b'):
+            app.publish(Request.blank(path).environ)
+        environ = Request.blank('/c').environ
+        environ['HTTP_HOST'] = 'example.com'
+        app.publish(environ)
+
+        lines = [line for line in metrics.exposition().splitlines()
+                 if line.startswith('otto_requests_total{')]
+        self.assertEqual(lines, [
+            'otto_requests_total{route="/:name"} 1',
+            'otto_requests_total{route="/:name",host="example.com"} 1',
+            'otto_requests_total{route="/api/:name"} 1',
+            ])
+
+        route = app.lookup('/a')[0].route
+        metrics.discard(route)
+        self.assertFalse('route="/:name"} 1' in metrics.exposition())
+
+    def test_replace(self):
+        from otto import Application
+        from otto.metrics import Metrics
+        from otto.publisher import Dispatcher
+        from otto.publisher import Publisher
+        from webob import Request
+        from webob import Response
+        metrics = Metrics()
+        app = Application(cache=10, metrics=metrics)
+        tenants = app.host('example.com').mount('/t', Publisher(cache=10))
+        first = tenants.connect(
+            '/:name', controller=lambda request, name: Response('first'))
+
+        def publish(path):
+            environ = Request.blank(path).environ
+            environ['HTTP_HOST'] = 'example.com'
+            return app.publish(environ)
+
+        self.assertEqual(publish('/t/a').body, b'first')
+        second = Dispatcher(
+            '/:name', controller=lambda request, name: Response('second'))
+        tenants.replace([second])
+        self.assertEqual(publish('/t/a').body, b'second')
+        self.assertEqual(second.path(name='a'), '/t/a')
+
+        site = app.host('example.org')
+        route = Dispatcher('/', controller=lambda request: Response('home'))
+        site.replace([route])
+        self.assertEqual(route.host, 'example.org')
+
+        # the metrics of the replaced route are dropped
+        self.assertEqual(list(metrics._routes), [second])
+
+        tenants.disconnect(second)
+        self.assertEqual(publish('/t/a').status_int, 404)
+        self.assertEqual(metrics._routes, {})
+
+        tenants.freeze()
+        self.assertRaises(RuntimeError, tenants.replace, [first])
+
+    def test_freeze(self):
+        import warnings
+        from otto import Application
+        from otto.router import CompiledRouter
+        from otto.publisher import ShadowedRouteWarning
+        from otto.metrics import Metrics
+        from webob import Response
+        metrics = Metrics()
+        app = Application(cache=10, metrics=metrics)
+        index = app.connect('/', controller=lambda request: 'index')
+        name = app.connect('/:name', controller=lambda request, name: name)
+        about = app.connect('/about', controller=lambda request: 'About')
+        docs = app.connect('/docs/*path', controller=lambda request, path: path)
+        page = app.connect('/docs/:page', controller=lambda request, page: page)
+        page.cached()._responses['key'] = Response()
+        metrics.route(page)
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            precedence = app.freeze()
+        self.assertEqual(
+            [(w.category, str(w.message)) for w in caught], [
+                (ShadowedRouteWarning,
+                 "Route '/about' is shadowed by '/:name'."),
+                (ShadowedRouteWarning,
+                 "Route '/docs/:page' is shadowed by '/docs/*path'."),
+                ])
+        self.assertEqual(precedence[name], (index, ))
+        self.assertEqual(precedence[docs], ())
+        self.assertEqual(precedence[page], (docs, ))
+        self.assertTrue(isinstance(app._router, CompiledRouter))
+        self.assertEqual(app.match('/about')(None), 'about')
+        self.assertEqual(app.match('/docs/a')(None), ('a', ))
+        self.assertEqual(app.match('/')(None), 'index')
+        self.assertRaises(RuntimeError, app.connect, '/other')
+
+        # the state of shadowed routes is dropped
+        self.assertEqual(page.cache_info().currsize, 0)
+        self.assertFalse(page in metrics._routes)
+
+    def test_methods(self):
+        from otto import Application
+        from webob import Request
+        from webob import Response
+        app = Application()
+        route = app.connect('/items')
+        route.controller(lambda request: Response('list'), method='GET')
+        route.controller(lambda request: Response('new'), method='POST')
+
+        def publish(method):
+            request = Request.blank('/items', method=method)
+            return app.publish(request.environ)
+
+        self.assertEqual(publish('POST').body, b'new')
+        self.assertEqual(publish('HEAD').status_int, 200)
+        response = publish('DELETE')
+        self.assertEqual(response.status_int, 405)
+        self.assertEqual(response.headers['Allow'], 'GET, HEAD, OPTIONS, POST')
+        response = publish('OPTIONS')
+        self.assertEqual(response.status_int, 200)
+        self.assertEqual(response.headers['Allow'], 'GET, HEAD, OPTIONS, POST')
+
+    def test_hosts(self):
+        from otto import Application
+        from webob import Request
+        from webob import Response
+        app = Application()
+        app.connect('/', controller=lambda request: Response('default'))
+        example = app.host('Example.com')
+        example.connect('/', controller=lambda request: Response('example'))
+        tenants = app.host('*.example.com')
+        route = tenants.connect(
+            '/:name', controller=lambda request, name: Response(name))
+        self.assertTrue(app.host('example.com') is example)
+
+        def publish(host, path='/'):
+            environ = Request.blank(path).environ
+            environ['HTTP_HOST'] = host
+            return app.publish(environ)
+
+        self.assertEqual(publish('example.com:8080').body, b'example')
+        self.assertEqual(publish('a.b.example.com', '/x').body, b'x')
+        self.assertEqual(publish('example.com', '/x').status_int, 404)
+        self.assertEqual(publish('other.com').body, b'default')
+        self.assertEqual(
+            route.url(name='x', host='a.example.com'), 'http://a.example.com/x')
+        self.assertRaises(TypeError, route.url, name='x')
+        self.assertEqual(
+            example.connect('/about').url(scheme='https'),
+            'https://example.com/about')
+
+    def test_mount(self):
+        from otto import Application
+        from otto.publisher import Publisher
+        from webob import Request
+        from webob import Response
+        app = Application(cache=10)
+        app.connect('/:name', controller=lambda request, name: Response(name))
+        api = Publisher()
+        users = api.connect(
+            '/users/:id', controller=lambda request, id: Response(id))
+        index = api.connect('/', controller=lambda request: Response('api'))
+        self.assertTrue(app.mount('/api/', api) is api)
+        v2 = api.mount('/v2', Publisher())
+        item = v2.connect('/items/:id', controller=lambda request, id: id)
+
+        def publish(path):
+            environ = Request.blank(path).environ
+            response = app.publish(environ)
+            self.assertEqual(environ['PATH_INFO'], path)
+            return response
+
+        self.assertEqual(publish('/api/users/1').body, b'1')
+        self.assertEqual(publish('/api/').body, b'api')
+        self.assertEqual(publish('/other').body, b'other')
+        response = publish('/api')
+        self.assertEqual(response.status_int, 301)
+        self.assertEqual(response.location, 'http://localhost/api/')
+        self.assertEqual(publish('/api/other').status_int, 404)
+        self.assertEqual(app.cache_info().currsize, 1)
+
+        self.assertEqual(users.path(id='1'), '/api/users/1')
+        self.assertEqual(index.path(), '/api/')
+        self.assertEqual(item.path_many([{'id': 1}]), ['/api/v2/items/1'])
+        self.assertEqual(app.match('/api/v2/items/2').keywords, {'id': '2'})
+
+    def test_cached_vary(self):
+        from otto import Application
+        from webob import Request
+        from webob import Response
+        app = Application()
+        calls = []
+
+        def greeting(request):
+            calls.append(request.path_info)
+            response = Response('hello %s %s' % (
+                request.headers.get('Accept-Language'),
+                request.cookies.get('user', 'anonymous')))
+            response.vary = ('Accept-Language', 'Cookie')
+            return response
+
+        # the response varies on a header which is not part of the key
+        app.connect('/a', controller=greeting).cached(ttl=60)
+        app.connect('/b', controller=greeting).cached(
+            ttl=60, vary=('Accept-Language', 'Cookie'))
+
+        def publish(path, **headers):
+            return app.publish(Request.blank(path, headers=headers).environ)
+
+        for path in ('/a', '/b'):
+            alice = publish(path, Accept_Language='de', Cookie='user=alice')
+            self.assertEqual(alice.body, b'hello de alice')
+            self.assertEqual(publish(path, Accept_Language='fr').body,
+                             b'hello fr anonymous')
+            response = publish(path, Accept_Language='de', Authorization='x',
+                               Cookie='user=alice')
+            self.assertEqual(response.body, b'hello de alice')
+
+        self.assertEqual(calls, ['/a'] * 3 + ['/b'] * 3)
+
+        # the response of the first request is cached (but not the one
+        # to the request with credentials)
+        response = publish('/b', Accept_Language='de', Cookie='user=alice')
+        self.assertEqual(response.body, b'hello de alice')
+        self.assertEqual(len(calls), 6)
+        self.assertEqual(
+            app.lookup('/b')[0].route.cache_info().currsize, 2)
+        self.assertEqual(
+            app.lookup('/a')[0].route.cache_info().currsize, 0)
+
+    def test_mount_per_request(self):
+        from otto import Application
+        from otto.mapper import PerRequest
+        from otto.publisher import Publisher
+        from webob import Request
+        from webob import Response
+        instances = []
+
+        class Mapper(object):
+            def __init__(self):
+                instances.append(self)
+
+            def resolve(self, path):
+                return len(instances)
+
+        app = Application()
+        api = app.mount('/api', Publisher())
+        v2 = api.mount('/v2', Publisher())
+
+        # routes are connected after mounting
+        for publisher in (api, v2):
+            publisher.connect(
+                '/*', mapper=PerRequest(Mapper),
+                controller=lambda context, request: Response(str(context)))
+
+        for path in ('/api/x', '/api/x', '/api/v2/x', '/api/v2/x'):
+            app.publish(Request.blank(path).environ)
+        self.assertEqual(len(instances), 4)
+
+    def test_cached(self):
+        from otto import Application
+        from otto.metrics import Metrics
+        from webob import Request
+        from webob import Response
+        calls = []
+
+        for app in (Application(), Application(metrics=Metrics())):
+            del calls[:]
+
+            @app.connect('/articles/:name').cached(
+                ttl=60, vary=('Accept-Language', ))
+            def article(request, name):
+                calls.append(name)
+                return Response(name + request.GET.get('page', ''))
+
+            @app.connect('/private/:name').cached()
+            def private(request, name):
+                calls.append(name)
+                response = Response(name)
+                response.set_cookie('session', 'secret')
+                return response
+
+            route = app.lookup('/articles/a')[0].route
+
+            response = app.publish(Request.blank('/articles/a').environ)
+            self.assertEqual(response.body, b'a')
+            etag = response.headers['ETag']
+            self.assertEqual(response.headers['Vary'], 'Accept-Language')
+
+            response = Request.blank('/articles/a').get_response(app)
+            self.assertEqual(response.body, b'a')
+            self.assertEqual(response.headers['ETag'], etag)
+            self.assertEqual(calls, ['a'])
+
+            # head requests are answered from the cache
+            request = Request.blank('/articles/a', method='HEAD')
+            self.assertEqual(request.get_response(app).body, b'')
+            self.assertEqual(calls, ['a'])
+
+            response = app.publish(Request.blank(
+                '/articles/a', headers={'If-None-Match': etag}).environ)
+            self.assertEqual(response.status_int, 304)
+            self.assertEqual(response.body, b'')
+
+            # the query string and vary headers are part of the key
+            app.publish(Request.blank('/articles/a?page=2').environ)
+            app.publish(Request.blank(
+                '/articles/a', headers={'Accept-Language': 'da'}).environ)
+            app.publish(Request.blank('/articles/b').environ)
+            self.assertEqual(calls, ['a', 'a', 'a', 'b'])
+            self.assertEqual(route.cache_info().hits, 3)
+            self.assertEqual(route.cache_info().currsize, 4)
+
+            # post requests are not cached
+            app.publish(Request.blank('/articles/b', method='POST').environ)
+            self.assertEqual(len(calls), 5)
+
+            self.assertEqual(route.invalidate(name='a'), 3)
+            app.publish(Request.blank('/articles/a').environ)
+            app.publish(Request.blank('/articles/b').environ)
+            self.assertEqual(calls[5:], ['a'])
+            self.assertEqual(route.invalidate(), 2)
+
+            # responses which set a cookie are not cached
+            app.publish(Request.blank('/private/a').environ)
+            app.publish(Request.blank('/private/a').environ)
+            self.assertEqual(calls[6:], ['a', 'a'])
@@ -0,0 +1,160 @@
+import sys
+import unittest
+
+
+def call(app, path, method='GET', headers=()):
+    return call_many(app, [path], method, headers)[0]
+
+
+def call_many(app, paths, method='GET', headers=()):
+    """Publish concurrent requests for ``paths``."""
+
+    import asyncio
+
+    async def request(path):
+        messages = [{'type': 'http.request', 'body': b''}]
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {
+            'type': 'http', 'method': method, 'path': path,
+            'query_string': b'', 'headers': list(headers),
+            'server': ('localhost', 80),
+            }
+
+        await app(scope, receive, send)
+        start = sent[0]
+        body = b"".join(message.get('body', b'') for message in sent[1:])
+        return start['status'], dict(start['headers']), body
+
+    async def main():
+        return await asyncio.gather(*[request(path) for path in paths])
+
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(main())
+    finally:
+        loop.close()
+
+
+@unittest.skipIf(sys.version_info < (3, 5), "Requires Python 3.5.")
+class ApplicationCase(unittest.TestCase):
+    def test_not_found(self):
+        from otto.asgi import Application
+        app = Application()
+        status, headers, body = call(app, '/path')
+        self.assertEqual(status, 404)
+        self.assertTrue(b'Page not found.' in body)
+
+    def test_redirect(self):
+        from otto.asgi import Application
+        app = Application()
+        app.connect('/docs/', controller=lambda request: None)
+        status, headers, body = call(app, '/docs')
+        self.assertEqual(status, 301)
+        self.assertEqual(headers[b'location'], b'http://localhost/docs/')
+
+    def test_sync_controller(self):
+        import threading
+        from webob import Response
+        from otto.asgi import Application
+        app = Application(max_workers=1)
+        threads = []
+
+        @app.connect('/:name')
+        def controller(request, name):
+            threads.append(threading.current_thread())
+            return Response(u"Hello, %s." % name)
+
+        status, headers, body = call(app, '/w%C3%B6rld')
+        self.assertEqual(status, 200)
+        self.assertEqual(body, u"Hello, w\xf6rld.".encode('utf-8'))
+        self.assertFalse(threads[0] is threading.current_thread())
+        app.close()
+
+    def test_body_iterator(self):
+        import threading
+        from webob import Response
+        from otto.asgi import Application
+        app = Application()
+        threads = []
+
+        def body():
+            for chunk in (b'Hello', b'', b' world'):
+                threads.append(threading.current_thread())
+                yield chunk
+
+        @app.connect('/')
+        async def controller(request):
+            return Response(app_iter=body())
+
+        status, headers, body = call(app, '/')
+        self.assertEqual(body, b'Hello world')
+        self.assertEqual(len(threads), 3)
+        self.assertFalse(threading.current_thread() in threads)
+        app.close()
+
+    def test_async_mapper(self):
+        from webob import Response
+        from otto.asgi import Application
+        from otto.asgi import path
+
+        class Mapper(object):
+            async def resolve(self, path):
+                return "/".join(path)
+
+            async def reverse(self, context):
+                return tuple(context.split('/'))
+
+        app = Application(Mapper)
+        route = app.connect('/docs/*')
+
+        @route.controller
+        async def controller(context, request):
+            return Response(context)
+
+        status, headers, body = call(app, '/docs/a/b')
+        self.assertEqual(status, 200)
+        self.assertEqual(body, b'a/b')
+
+        import asyncio
+        loop = asyncio.new_event_loop()
+        try:
+            generated = loop.run_until_complete(path(route, 'a/b'))
+        finally:
+            loop.close()
+        self.assertEqual(generated, '/docs/a/b')
+
+    def test_per_request(self):
+        import asyncio
+        from webob import Response
+        from otto.asgi import Application
+        from otto.mapper import PerRequest
+        instances = []
+
+        class Mapper(object):
+            def __init__(self):
+                instances.append(self)
+
+            async def resolve(self, path):
+                await asyncio.sleep(0)
+                return self
+
+        mapper = PerRequest(Mapper)
+        app = Application(mapper)
+        route = app.connect('/*')
+
+        @route.controller
+        async def controller(context, request):
+            await asyncio.sleep(0)
+            return Response(str(mapper() is context))
+
+        results = call_many(app, ['/a', '/b', '/c'])
+        self.assertEqual(len(instances), 3)
+        self.assertEqual([body for status, headers, body in results],
+                         [b'True', b'True', b'True'])
@@ -0,0 +1,29 @@
+import unittest
+
+class BenchmarksCase(unittest.TestCase):
+    def test_table(self):
+        from otto.benchmarks import table
+        from otto.benchmarks import requests
+        from otto.router import Router
+        from otto.router import Route
+        router = Router()
+        for path in table(20):
+            router.connect(Route(path))
+        hits, misses, redirects = requests(20, 20)
+        for path in hits:
+            self.assertNotEqual(router.match(path), None, path)
+        for path in misses:
+            self.assertEqual(router.search(path), (None, None), path)
+        for path in redirects:
+            self.assertNotEqual(router.search(path)[1], None, path)
+
+    def test_run(self):
+        from otto.benchmarks import run
+        from otto.benchmarks import compare
+        a = run('router', sizes=[10], repeat=1)
+        b = run('compiled', sizes=[10], repeat=1, select='match')
+        self.assertTrue('publish.hit.10' in a['results'])
+        self.assertEqual(a['results']['match.hit.10']['ops'], 1000)
+        self.assertFalse(a['results']['startup.import']['webob'])
+        lines = compare(a, b)
+        self.assertEqual(len(lines), 1 + len(a['results']))
@@ -21,3 +21,91 @@ class DispatcherCase(unittest.TestCase):
         controller = dispatcher.dispatch(matchdict)
         self.assertEqual(test, ['foo', 'boo'])
         self.assertEqual(matchdict, {'name': 'bar'})
+
+    def test_path_many(self):
+        from otto.publisher import Dispatcher
+
+        instances = []
+        class Mapper(object):
+            def __init__(self):
+                instances.append(self)
+
+            def reverse(self, context):
+                return context.split('.')
+
+        dispatcher = Dispatcher("/docs/*/:name", mapper=Mapper)
+        paths = dispatcher.path_many(['a.b', 'c'], name='d')
+        self.assertEqual(paths, ['/docs/a/b/d', '/docs/c/d'])
+        self.assertEqual(len(instances), 1)
+
+        dispatcher = Dispatcher("/users/:id")
+        paths = dispatcher.path_many([{'id': 1}, {'id': 'a b'}])
+        self.assertEqual(paths, ['/users/1', '/users/a%20b'])
+
+    def test_bind(self):
+        from otto.publisher import Dispatcher
+
+        class Document(object):
+            pass
+
+        class Page(Document):
+            pass
+
+        class Image(object):
+            pass
+
+        dispatcher = Dispatcher("/*")
+
+        @dispatcher.controller(type=Document)
+        def document(context):
+            pass
+
+        self.assertTrue(dispatcher.bind(Page) is document)
+        self.assertTrue(dispatcher.bind(Image) is document)
+        self.assertEqual(dispatcher.bindings()[Page], document)
+
+        @dispatcher.controller(type=Image)
+        def image(context):
+            pass
+
+        self.assertTrue(dispatcher.bind(Image) is image)
+        self.assertTrue(dispatcher.bind(Page) is document)
+        self.assertEqual(
+            dispatcher.bindings(),
+            {object: image, Document: document, Page: document,
+             Image: image})
+
+    def test_methods(self):
+        from otto.publisher import Dispatcher
+        from otto.publisher import MethodNotAllowed
+
+        resolved = []
+        class Mapper(object):
+            def resolve(self, path):
+                resolved.append(path)
+                return "/".join(path)
+
+        dispatcher = Dispatcher("/docs/*", mapper=Mapper)
+        dispatcher.controller(lambda context: 'get', method='GET')
+        dispatcher.controller(
+            lambda context: 'put', methods=('put', 'POST'), type=str)
+        self.assertEqual(dispatcher.allow, "GET, HEAD, OPTIONS, POST, PUT")
+
+        self.assertEqual(dispatcher.dispatch({'': ('a', )}, 'GET')(), 'get')
+        self.assertEqual(dispatcher.dispatch({'': ('a', )}, 'HEAD')(), 'get')
+        self.assertEqual(dispatcher.dispatch({'': ('a', )}, 'PUT')(), 'put')
+        self.assertEqual(len(resolved), 3)
+
+        for method in ('DELETE', 'OPTIONS'):
+            try:
+                dispatcher.dispatch({'': ('a', )}, method)
+            except MethodNotAllowed as e:
+                self.assertEqual(e.allow, dispatcher.allow)
+            else:
+                self.fail("Expected exception.")
+        self.assertEqual(len(resolved), 3)
+
+        # a controller for any method handles the other methods
+        dispatcher.controller(lambda context: 'any', type=str)
+        self.assertEqual(
+            dispatcher.dispatch({'': ('a', )}, 'DELETE')(), 'any')
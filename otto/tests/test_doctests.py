@@ -12,9 +12,24 @@ class DoctestCase(unittest.TestCase):
     @classmethod
     def test_modules(cls):
         import otto.router
+        import otto.cache
+        import otto.utils
+        import otto.metrics
+        import otto.static
+        import otto.responses
         suite = unittest.TestSuite()
         suite.addTest(doctest.DocTestSuite(otto.router,
                                            optionflags=OPTIONFLAGS))
+        suite.addTest(doctest.DocTestSuite(otto.cache,
+                                           optionflags=OPTIONFLAGS))
+        suite.addTest(doctest.DocTestSuite(otto.utils,
+                                           optionflags=OPTIONFLAGS))
+        suite.addTest(doctest.DocTestSuite(otto.metrics,
+                                           optionflags=OPTIONFLAGS))
+        suite.addTest(doctest.DocTestSuite(otto.static,
+                                           optionflags=OPTIONFLAGS))
+        suite.addTest(doctest.DocTestSuite(otto.responses,
+                                           optionflags=OPTIONFLAGS))
         return suite
 
     @classmethod
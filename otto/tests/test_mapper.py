@@ -0,0 +1,123 @@
+import unittest
+
+
+class Mapper(object):
+    instances = []
+
+    def __init__(self, **kw):
+        self.kw = kw
+        self.instances.append(self)
+
+    def resolve(self, path):
+        return self
+
+    def reverse(self, context):
+        return ()
+
+
+class MapperCase(unittest.TestCase):
+    def setUp(self):
+        del Mapper.instances[:]
+
+    def test_singleton(self):
+        from otto.mapper import Singleton
+        mapper = Singleton(Mapper)
+        self.assertTrue(mapper() is mapper())
+        self.assertEqual(len(Mapper.instances), 1)
+        self.assertRaises(TypeError, mapper, tenant='a')
+
+    def test_pool(self):
+        from otto.mapper import Pool
+        mapper = Pool(Mapper, size=2)
+        a = mapper(tenant='a')
+        self.assertTrue(mapper(tenant='a') is a)
+        self.assertEqual(a.kw, {'tenant': 'a'})
+        mapper(tenant='b')
+        mapper(tenant='c')
+        self.assertEqual(mapper.info().evictions, 1)
+        self.assertFalse(mapper(tenant='a') is a)
+
+    def test_per_request(self):
+        from otto import Application
+        from otto.mapper import PerRequest
+        from otto.tests.utils import get_response
+        from webob import Response
+        mapper = PerRequest(Mapper)
+        app = Application(mapper)
+        contexts = []
+
+        @app.connect('/:tenant/*')
+        def controller(context, request):
+            contexts.append(context)
+            self.assertTrue(mapper(tenant='a') is context)
+            return Response()
+
+        get_response(app, '/a/b')
+        get_response(app, '/a/c')
+        self.assertEqual(len(Mapper.instances), 2)
+        self.assertFalse(contexts[0] is contexts[1])
+
+
+class Folder(dict):
+    gets = []
+
+    def __init__(self, name=None, parent=None):
+        self.__name__ = name
+        self.__parent__ = parent
+
+    def __getitem__(self, name):
+        self.gets.append(name)
+        return dict.__getitem__(self, name)
+
+    def add(self, name):
+        folder = self[name] = Folder(name, self)
+        return folder
+
+
+class TraverserCase(unittest.TestCase):
+    def setUp(self):
+        del Folder.gets[:]
+        self.root = Folder()
+        b = self.root.add('a').add('b')
+        b.add('c')
+        b.add('d')
+
+    def test_prefix(self):
+        from otto.mapper import Traverser
+        traverser = Traverser(self.root)()
+        c = traverser.resolve(('a', 'b', 'c'))
+        self.assertEqual(c.__name__, 'c')
+        d = traverser.resolve(('a', 'b', 'd'))
+        self.assertEqual(d.__name__, 'd')
+        self.assertEqual(Folder.gets, ['a', 'b', 'c', 'd'])
+        self.assertEqual(traverser.reverse(d), ('a', 'b', 'd'))
+        self.assertTrue(traverser.resolve(()) is self.root)
+
+    def test_invalidate(self):
+        from otto.mapper import Traverser
+        traverser = Traverser(self.root)
+        traverser.resolve(('a', 'b', 'c'))
+        traverser.invalidate(('a', 'b'))
+        traverser.resolve(('a', 'b', 'c'))
+        self.assertEqual(Folder.gets, ['a', 'b', 'c', 'b', 'c'])
+        traverser.invalidate()
+        traverser.resolve(('a', ))
+        self.assertEqual(Folder.gets[-1], 'a')
+
+    def test_ttl(self):
+        from otto.mapper import Traverser
+        traverser = Traverser(self.root, ttl=60)
+        traverser._cache._timer = lambda: 0
+        traverser.resolve(('a', 'b'))
+        traverser._cache._timer = lambda: 120
+        traverser.resolve(('a', 'b'))
+        self.assertEqual(Folder.gets, ['a', 'b', 'a', 'b'])
+
+    def test_publisher(self):
+        from otto.publisher import Publisher
+        from otto.mapper import Traverser
+        publisher = Publisher(Traverser(self.root))
+        route = publisher.connect('/docs/*', controller=lambda context: context)
+        context = publisher.match('/docs/a/b')()
+        self.assertEqual(context.__name__, 'b')
+        self.assertEqual(route.path(context), '/docs/a/b')
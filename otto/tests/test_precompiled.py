@@ -0,0 +1,65 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+class PrecompiledCase(unittest.TestCase):
+    def setUp(self):
+        from otto import precompiled
+        precompiled.clear()
+        self.path = tempfile.mkdtemp()
+        self.filename = os.path.join(self.path, 'routes.json')
+
+    def tearDown(self):
+        from otto import precompiled
+        precompiled.clear()
+        shutil.rmtree(self.path)
+
+    def test_save_and_load(self):
+        import re
+        from otto import precompiled
+        from otto.router import Route
+        self.assertEqual(precompiled.load(self.filename), 0)
+        Route('/docs/:name/*')
+        precompiled.save(self.filename)
+        precompiled.clear()
+        self.assertEqual(precompiled.load(self.filename), 2)
+        expression = sorted(precompiled._loaded)[0]
+        self.assertEqual(
+            precompiled.compile(expression), re.compile(expression))
+        route = Route('/docs/:name/*')
+        self.assertEqual(
+            route.match('/docs/a/b/c'), {'name': 'a', '': ('b', 'c')})
+        self.assertEqual(route.match_slash('/docs/a'), True)
+
+    def test_outdated(self):
+        import json
+        from otto import precompiled
+        with open(self.filename, 'w') as f:
+            json.dump({'fingerprint': 'other', 'patterns': {'^a$': []}}, f)
+        self.assertEqual(precompiled.load(self.filename), 0)
+        self.assertEqual(precompiled.load(self.filename + '.missing'), 0)
+
+    def test_recording(self):
+        from otto import precompiled
+        from otto.router import Route
+        Route('/a/:b')
+        self.assertEqual(len(precompiled._used), 0)
+        precompiled.load(self.filename)
+        Route('/a/:b')
+        precompiled.save(self.filename)
+        Route('/c/:d')
+        self.assertEqual(len(precompiled._used), 2)
+
+    def test_unavailable(self):
+        from otto import precompiled
+        from otto.router import Route
+        code = precompiled._code
+        precompiled._code = None
+        try:
+            precompiled.load(self.filename)
+            Route('/a/:b')
+            precompiled.save(self.filename)
+        finally:
+            precompiled._code = code
+        self.assertFalse(os.path.exists(self.filename))
@@ -23,6 +23,92 @@ class RouterCase(unittest.TestCase):
         self.assertEqual(matches[1].route, route2)
         self.assertEqual(matches[2].route, route4)
 
+    def test_search(self):
+        from otto.router import Router
+        from otto.router import Route
+        from otto.router import toggle
+        router = Router()
+        route1 = Route('/a/')
+        route2 = Route('/:name')
+        router.connect(route1)
+        router.connect(route2)
+        self.assertEqual(router.search('/a/')[0].route, route1)
+        self.assertEqual(router.search('/a')[0].route, route2)
+        self.assertEqual(router.search('/b/'), (None, '/b'))
+        self.assertEqual(router.search('/b/c'), (None, None))
+
+        for path in ('/a', '/a/', '/a//', '/b/', '/b//', '/', ''):
+            match = router.match(path)
+            if match is not None:
+                expected = match, None
+            elif router.match(toggle(path)) is not None:
+                expected = None, toggle(path)
+            else:
+                expected = None, None
+            self.assertEqual(router.search(path), expected, path)
+
+    def test_disconnect(self):
+        from otto.router import Router
+        from otto.router import TreeRouter
+        from otto.router import CompiledRouter
+        from otto.router import Route
+        paths = TreeRouterCase.paths
+        requests = TreeRouterCase.requests
+        routes = [Route(path) for path in paths]
+        removed = routes[1::3]
+        remaining = [route for route in routes if route not in removed]
+
+        for factory in (Router, TreeRouter, CompiledRouter):
+            router = factory()
+            expected = Router()
+            for route in routes:
+                router.connect(route)
+            router.match('/')
+            for route in removed:
+                router.disconnect(route)
+            self.assertRaises(ValueError, router.disconnect, removed[0])
+            for route in remaining:
+                expected.connect(route)
+            for path in requests:
+                self.assertEqual(
+                    router.search(path), expected.search(path), path)
+
+            # removing all routes leaves an empty tree
+            for route in remaining:
+                router.disconnect(route)
+            if factory is TreeRouter:
+                self.assertTrue(router._index[0].empty())
+
+            self.assertEqual(router.replace(reversed(routes)), [])
+            expected.replace(reversed(routes))
+            router.connect(removed[0])
+            expected.connect(removed[0])
+            for path in requests:
+                self.assertEqual(router.match(path), expected.match(path), path)
+
+    def test_escaped_asterisk(self):
+        from otto.router import Router
+        from otto.router import TreeRouter
+        from otto.router import CompiledRouter
+        from otto.router import Route
+        paths = ('/a/\\*', '/:x/\\*b', '//\\*b', '/a\\*')
+        requests = ('/a', '/a/', '/a//', '/b', '/x/b', '//b', '/', '')
+
+        for path in paths:
+            route = Route(path)
+            expected = Router()
+            expected.connect(route)
+            for factory in (TreeRouter, CompiledRouter):
+                router = factory()
+                router.connect(route)
+                for request in requests:
+                    self.assertEqual(
+                        router.match(request), expected.match(request),
+                        (factory, path, request))
+                    self.assertEqual(
+                        router.search(request), expected.search(request),
+                        (factory, path, request))
+
 class RouteCase(unittest.TestCase):
     def test_asterisk(self):
         from otto.router import Route
@@ -31,6 +117,16 @@ class RouteCase(unittest.TestCase):
         self.assertTrue(match1 is not None)
         self.assertEqual(match1['subpath'], (u'style', u'helper.css'))
 
+    def test_lazy_compilation(self):
+        from otto.router import Route
+        route = Route('/docs/:name/', lazy=True)
+        self.assertFalse('match' in route.__dict__)
+        self.assertEqual(route.path(name='a'), '/docs/a/')
+        self.assertFalse('match' in route.__dict__)
+        self.assertEqual(route.match('/docs/a/'), {'name': u'a'})
+        self.assertEqual(route.match_slash('/docs/a'), True)
+        self.assertRaises(AttributeError, getattr, route, 'other')
+
     def test_asterisk_and_name(self):
         from otto.router import Route
         route1 = Route("/repr/*/:name")
@@ -38,3 +134,134 @@ class RouteCase(unittest.TestCase):
         self.assertTrue(match1 is not None)
         self.assertEqual(match1[''], (u'math',))
         self.assertEqual(match1['name'], u'pi')
+
+class TreeRouterCase(unittest.TestCase):
+    paths = (
+        '/', '', '/test', '/:test', '/no-match/:test', '/te:match',
+        '/docs/*', '/docs/*/:name', '/docs/index', '/a/:b/c', '/a/:b/',
+        '/a/b/c', 'static*subpath', '/s/(?=[abc]+):term', '/a/?:b',
+        r'/(?=.+\.txt)*', '/robots.txt', '/x|/y',
+        )
+
+    requests = (
+        '/', '', '/test', '/te', '/no-match/x', '/docs', '/docs/',
+        '/docs/index', '/docs/a/b', '/a/b/c', '/a/x/c', '/a/b/',
+        '/a/b', '/ab', '/static/style.css', '/s/abc', '/s/xyz',
+        '/file.txt', '/robots.txt', '/robotsxtxt', '/y', '/x', '//',
+        '/a%20b', '/a/b%2Fc/c', '/docs/a%2Fb/c',
+        )
+
+    def test_same_matches(self):
+        from otto.router import Router
+        from otto.router import TreeRouter
+        from otto.router import Route
+        router = Router()
+        tree = TreeRouter()
+        for path in self.paths:
+            route = Route(path)
+            router.connect(route)
+            tree.connect(route)
+
+        for path in self.requests:
+            expected = list(router(path))
+            self.assertEqual(list(tree(path)), expected, path)
+            self.assertEqual(tree.match(path), router.match(path), path)
+            self.assertEqual(tree.search(path), router.search(path), path)
+
+    def test_publisher(self):
+        from otto.publisher import Publisher
+        from otto.router import TreeRouter
+        publisher = Publisher(router=TreeRouter())
+        publisher.connect('/:name', controller=lambda name: name)
+        publisher.connect('/docs/*path', controller=lambda path: path)
+        self.assertEqual(publisher.match('/foo')(), 'foo')
+        self.assertEqual(publisher.match('/docs/a/b')(), ('a', 'b'))
+        self.assertEqual(publisher.match('/a/b/c'), None)
+
+    def test_publisher_disconnect(self):
+        from otto.publisher import Publisher
+        from otto.router import TreeRouter
+        publisher = Publisher(router=TreeRouter(), cache=10)
+        route = publisher.connect('/:name', controller=lambda name: name)
+        publisher.connect('/*path', controller=lambda path: path)
+        self.assertEqual(publisher.match('/foo')(), 'foo')
+        publisher.disconnect(route)
+        self.assertEqual(publisher.match('/foo')(), ('foo', ))
+        self.assertEqual(publisher.cache_info().currsize, 1)
+        self.assertRaises(ValueError, publisher.disconnect, route)
+
+
+class CompiledRouterCase(TreeRouterCase):
+    def test_same_matches(self):
+        from otto.router import Router
+        from otto.router import CompiledRouter
+        from otto.router import Route
+        router = Router()
+        compiled = CompiledRouter()
+        for path in self.paths:
+            route = Route(path)
+            router.connect(route)
+            compiled.connect(route)
+
+        for path in self.requests:
+            self.assertEqual(compiled.match(path), router.match(path), path)
+            self.assertEqual(
+                compiled.search(path), router.search(path), path)
+
+    def test_lazy(self):
+        from otto.router import CompiledRouter
+        from otto.router import Route
+        router = CompiledRouter()
+        routes = [Route(path, lazy=True) for path in ('/a/:b', '/c/*')]
+        for route in routes:
+            router.connect(route)
+        self.assertEqual(router.match('/a/b').dict, {'b': u'b'})
+        self.assertFalse('match' in routes[0].__dict__)
+        self.assertTrue('match' in routes[1].__dict__)
+
+    def test_recompile(self):
+        from otto.router import CompiledRouter
+        from otto.router import Route
+        router = CompiledRouter()
+        router.connect(Route('/a'))
+        self.assertEqual(router.match('/b'), None)
+        source = router.source
+        route = Route('/:name')
+        router.connect(route)
+        self.assertEqual(router.match('/b').route, route)
+        self.assertNotEqual(router.source, source)
+
+    def test_publisher(self):
+        from otto.publisher import Publisher
+        from otto.router import CompiledRouter
+        publisher = Publisher(router=CompiledRouter())
+        publisher.connect('/:name', controller=lambda name: name)
+        publisher.connect('/docs/*path', controller=lambda path: path)
+        self.assertEqual(publisher.match('/foo')(), 'foo')
+        self.assertEqual(publisher.match('/docs/a/b')(), ('a', 'b'))
+        self.assertEqual(publisher.match('/a/b/c'), None)
+
+    def test_path(self):
+        from otto.router import Route
+        route = Route('/docs/*/:name')
+        self.assertEqual(route.path(**{'': ('a b', ), 'name': 'c'}),
+                         '/docs/a%20b/c')
+        self.assertRaises(TypeError, route.path, name='c')
+        self.assertRaises(TypeError, route.path, **{'': (), 'id': 1})
+        self.assertRaises(
+            TypeError, route.path, **{'': (), 'name': 'c', 'id': 1})
+
+    def test_path_many(self):
+        from otto.router import Route
+        route = Route('/docs/*/:name')
+        matchdicts = [
+            {'': ('a b', ), 'name': 'c'},
+            {'': 'x/y', 'name': 5},
+            {'': ['a b'], 'name': 'c'},
+            {'': ('a b', ), 'name': True},
+            {'': ('a b', ), 'name': 1},
+            ]
+        self.assertEqual(
+            route.path_many(matchdicts),
+            [route.path(**matchdict) for matchdict in matchdicts])
+        self.assertRaises(TypeError, route.path_many, [{'name': 'c'}])
@@ -0,0 +1,148 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+class StaticCase(unittest.TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        os.mkdir(os.path.join(self.path, 'static'))
+        self.filename = os.path.join(self.path, 'static', 'hello.txt')
+        with open(self.filename, 'wb') as f:
+            f.write(b'Hello world!')
+        with open(os.path.join(self.path, 'secret.txt'), 'wb') as f:
+            f.write(b'Secret')
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def _makeApp(self, **kw):
+        from otto import Application
+        from otto.static import Static
+        app = Application()
+        self.static = Static(os.path.join(self.path, 'static'), **kw)
+        app.connect('/static/*subpath', controller=self.static)
+        return app
+
+    def _call(self, app, path, **kw):
+        from webob import Request
+        request = Request.blank(path, **kw)
+        return request.get_response(app)
+
+    def test_get(self):
+        app = self._makeApp(chunk_size=5)
+        response = self._call(app, '/static/hello.txt')
+        self.assertEqual(response.status_int, 200)
+        self.assertEqual(response.body, b'Hello world!')
+        self.assertEqual(response.content_type, 'text/plain')
+        self.assertEqual(response.content_length, 12)
+        self.assertTrue(response.etag)
+        self.assertTrue(response.last_modified)
+
+        response = self._call(app, '/static/hello.txt', method='HEAD')
+        self.assertEqual(response.status_int, 200)
+        self.assertEqual(response.body, b'')
+        self.assertEqual(response.content_length, 12)
+
+        response = self._call(app, '/static/hello.txt', method='POST')
+        self.assertEqual(response.status_int, 405)
+
+    def test_file_wrapper(self):
+        app = self._makeApp()
+        wrapped = []
+
+        def file_wrapper(f, chunk_size):
+            wrapped.append(f)
+            return iter(lambda: f.read(chunk_size), b'')
+
+        response = self._call(
+            app, '/static/hello.txt',
+            environ={'wsgi.file_wrapper': file_wrapper})
+        self.assertEqual(response.body, b'Hello world!')
+        self.assertEqual(len(wrapped), 1)
+
+    def test_not_found(self):
+        app = self._makeApp()
+        for path in ('/static/missing.txt', '/static/../secret.txt',
+                     '/static/%2E%2E/secret.txt', '/static/..%2Fsecret.txt',
+                     '/static/', '/static/hello.txt%00'):
+            response = self._call(app, path)
+            self.assertEqual(response.status_int, 404, path)
+
+        os.symlink(os.path.join(self.path, 'secret.txt'),
+                   os.path.join(self.path, 'static', 'link.txt'))
+        response = self._call(app, '/static/link.txt')
+        self.assertEqual(response.status_int, 404)
+
+    def test_conditional(self):
+        app = self._makeApp()
+        response = self._call(app, '/static/hello.txt')
+        etag = response.headers['ETag']
+        last_modified = response.headers['Last-Modified']
+
+        # the file isn't accessed for cached metadata
+        os.remove(self.filename)
+
+        response = self._call(
+            app, '/static/hello.txt', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_int, 304)
+        self.assertEqual(response.body, b'')
+        self.assertEqual(response.headers['ETag'], etag)
+
+        response = self._call(
+            app, '/static/hello.txt',
+            headers={'If-None-Match': '"other", W/%s' % etag})
+        self.assertEqual(response.status_int, 304)
+
+        response = self._call(
+            app, '/static/hello.txt',
+            headers={'If-Modified-Since': last_modified})
+        self.assertEqual(response.status_int, 304)
+
+        self.static.clear()
+        response = self._call(
+            app, '/static/hello.txt', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_int, 404)
+
+    def test_modified(self):
+        app = self._makeApp()
+        response = self._call(
+            app, '/static/hello.txt',
+            headers={'If-None-Match': '"other"',
+                     'If-Modified-Since': 'Sat, 01 Jan 2000 00:00:00 GMT'})
+        self.assertEqual(response.status_int, 200)
+        response = self._call(
+            app, '/static/hello.txt',
+            headers={'If-Modified-Since': 'Sat, 01 Jan 2000 00:00:00 GMT'})
+        self.assertEqual(response.status_int, 200)
+        self.assertEqual(response.body, b'Hello world!')
+
+    def test_range(self):
+        app = self._makeApp(chunk_size=2)
+        response = self._call(
+            app, '/static/hello.txt', headers={'Range': 'bytes=6-10'})
+        self.assertEqual(response.status_int, 206)
+        self.assertEqual(response.body, b'world')
+        self.assertEqual(response.headers['Content-Range'], 'bytes 6-10/12')
+
+        response = self._call(
+            app, '/static/hello.txt', headers={'Range': 'bytes=-6'})
+        self.assertEqual(response.body, b'world!')
+
+        response = self._call(
+            app, '/static/hello.txt', headers={'Range': 'bytes=12-'})
+        self.assertEqual(response.status_int, 416)
+        self.assertEqual(response.headers['Content-Range'], 'bytes */12')
+
+        response = self._call(
+            app, '/static/hello.txt',
+            headers={'Range': 'bytes=0-4', 'If-Range': '"other"'})
+        self.assertEqual(response.status_int, 200)
+        self.assertEqual(response.body, b'Hello world!')
+
+        etag = response.headers['ETag']
+        response = self._call(
+            app, '/static/hello.txt',
+            headers={'Range': 'bytes=0-4', 'If-Range': etag})
+        self.assertEqual(response.status_int, 206)
+        self.assertEqual(response.body, b'Hello')
@@ -0,0 +1,85 @@
+import unittest
+
+class QuoteCase(unittest.TestCase):
+    def test_safe(self):
+        from otto.utils import url_quote
+        self.assertEqual(url_quote('a b/c'), 'a%20b%2Fc')
+        self.assertEqual(url_quote('a b/c', '/'), 'a%20b/c')
+        self.assertEqual(url_quote('a]^b', ']^'), 'a]^b')
+        self.assertEqual(url_quote('abc'), 'abc')
+
+    def test_unicode(self):
+        from otto.utils import url_quote
+        self.assertEqual(url_quote(u'\xe6 \u65e5'), '%C3%A6%20%E6%97%A5')
+
+    def test_many(self):
+        from otto.utils import url_quote
+        from otto.utils import url_quote_many
+        segments = [u'\u65e5', 'a\x00b', '', 'c d']
+        self.assertEqual(
+            url_quote_many(segments), [url_quote(s) for s in segments])
+        self.assertEqual(url_quote_many(segments[2:]), ['', 'c%20d'])
+        self.assertEqual(url_quote_many([]), [])
+
+    def test_route_path(self):
+        from otto.router import Route
+        route = Route('/:name')
+        self.assertEqual(route.path(name=u'\u65e5'), '/%E6%97%A5')
+
+class SegmentCacheCase(unittest.TestCase):
+    def tearDown(self):
+        from otto.utils import set_segment_cache
+        set_segment_cache()
+
+    def test_bounded(self):
+        from otto.utils import quote_path_segment
+        from otto.utils import set_segment_cache
+        from otto.utils import segment_cache_info
+        for policy in ('clock', 'lru'):
+            set_segment_cache(2, policy)
+            for segment in ('a b', 'c', 'a b', 'd', 'e'):
+                quote_path_segment(segment)
+            self.assertEqual(quote_path_segment('a b'), 'a%20b')
+            info = segment_cache_info()
+            self.assertEqual(info.currsize, 2)
+            self.assertEqual(info.hits + info.misses, 6)
+            self.assertTrue(info.evictions >= 2)
+
+    def test_disabled(self):
+        from otto.utils import quote_path_segment
+        from otto.utils import set_segment_cache
+        from otto.utils import segment_cache_info
+        for policy in ('clock', 'lru'):
+            set_segment_cache(0, policy)
+            for i in range(2):
+                self.assertEqual(quote_path_segment('a b'), 'a%20b')
+            info = segment_cache_info()
+            self.assertEqual(info.currsize, 0)
+            self.assertEqual(info.hits, 0)
+
+    def test_unknown_policy(self):
+        from otto.utils import set_segment_cache
+        self.assertRaises(ValueError, set_segment_cache, 2, 'fifo')
+
+class LRUCacheCase(unittest.TestCase):
+    def test_concurrent_writes(self):
+        import threading
+        from otto.cache import LRUCache
+        cache = LRUCache(2)
+        errors = []
+
+        def write():
+            try:
+                for i in range(20000):
+                    cache[i % 7] = i
+                    cache.get(i % 5)
+            except Exception as e: # pragma no cover
+                errors.append(e)
+
+        threads = [threading.Thread(target=write) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(len(cache), 2)
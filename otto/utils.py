@@ -1,16 +1,30 @@
 import re
 
+from otto.cache import ClockCache
+from otto.cache import LRUCache
+
 always_safe = ('ABCDEFGHIJKLMNOPQRSTUVWXYZ'
                'abcdefghijklmnopqrstuvwxyz'
                '0123456789' '_.-')
-_safemaps = {}
-_must_quote = {}
+_tables = {}
 
 try:
     unicode
 except NameError:
     unicode = None
 
+try:
+    str.isascii
+except AttributeError: # pragma no cover
+    def isascii(s):
+        try:
+            s.encode('ascii')
+        except UnicodeError:
+            return False
+        return True
+else:
+    isascii = str.isascii
+
 
 def url_quote(s, safe=''):
     """quote('abc def') -> 'abc%20def'
@@ -35,24 +49,119 @@ def url_quote(s, safe=''):
     path segments instead of an already composed path that might have
     '/' characters in it.  Thus, it *will* encode any '/' character it
     finds in a string.
+
+    Non-ASCII characters are quoted using their UTF-8 encoding.
     """
-    cachekey = (safe, always_safe)
     try:
-        safe_map = _safemaps[cachekey]
-        if not _must_quote[cachekey].search(s):
-            return s
+        search, table = _tables[safe]
     except KeyError:
-        safe += always_safe
-        _must_quote[cachekey] = re.compile(r'[^%s]' % safe)
-        safe_map = {}
+        search, table = _tables[safe] = _compile(safe)
+
+    if search(s) is None:
+        return s
+
+    if bytes is str: # pragma no cover
+        if s.__class__ is unicode:
+            s = s.encode('utf-8')
+        return ''.join(map(table.__getitem__, s))
+
+    if not isascii(s):
+        s = s.encode('utf-8').decode('latin-1')
+
+    return s.translate(table)
+
+def path_info(environ):
+    """Return the decoded ``PATH_INFO`` of ``environ``.
+
+    This is equivalent to ``Request(environ).path_info``; on Python 3,
+    only non-ASCII paths are decoded.
+
+    >>> path_info({'PATH_INFO': '/caf\xc3\xa9'}) == u'/caf\xe9'
+    True
+    """
+
+    path = environ.get('PATH_INFO', '')
+    if bytes is str: # pragma no cover
+        return path.decode('utf-8')
+    if not isascii(path):
+        path = path.encode('latin-1').decode('utf-8')
+    return path
+
+def host_name(environ):
+    """Return the lowercase host name (without port) of ``environ``.
+
+    >>> host_name({'HTTP_HOST': 'Example.com:8080'})
+    'example.com'
+
+    >>> host_name({'HTTP_HOST': '[::1]:8080'})
+    '[::1]'
+
+    >>> host_name({'SERVER_NAME': 'localhost'})
+    'localhost'
+    """
+
+    host = environ.get('HTTP_HOST') or environ.get('SERVER_NAME', '')
+    i = host.rfind(':')
+    if i > host.rfind(']'):
+        host = host[:i]
+    return host.lower().rstrip('.')
+
+def url_quote_many(segments, safe=''):
+    """Quote each string in ``segments`` and return list of results.
+
+    The segments are quoted in a single pass when possible.
+
+    >>> url_quote_many(['a b', 'c/d', ''])
+    ['a%20b', 'c%2Fd', '']
+    """
+    segments = list(segments)
+    if not segments:
+        return []
+
+    if '%' not in safe and '\x00' not in safe:
+        joined = '\x00'.join(segments)
+        if joined.count('\x00') == len(segments) - 1:
+            return url_quote(joined, safe).split('%00')
+
+    return [url_quote(s, safe) for s in segments]
+
+def _compile(safe):
+    safe += always_safe
+    search = re.compile(r'[^%s]' % re.escape(safe)).search
+    if bytes is str: # pragma no cover
+        table = {}
         for i in range(256):
             c = chr(i)
-            safe_map[c] = (c in safe) and c or ('%%%02X' % i)
-        _safemaps[cachekey] = safe_map
-    res = map(safe_map.__getitem__, s)
-    return ''.join(res)
+            table[c] = (c in safe) and c or ('%%%02X' % i)
+    else:
+        table = dict(
+            (i, '%%%02X' % i) for i in range(256) if chr(i) not in safe)
+    return search, table
+
+_policies = {'clock': ClockCache, 'lru': LRUCache}
+_segment_cache = ClockCache(4096)
+
+def set_segment_cache(maxsize=4096, policy='clock'):
+    """Replace the cache used by :func:`quote_path_segment`.
+
+    The ``policy`` argument selects the eviction policy; it must be
+    either ``'clock'`` (the default) or ``'lru'``. A ``maxsize`` of
+    zero disables the cache.
+    """
+
+    global _segment_cache
+
+    try:
+        factory = _policies[policy]
+    except KeyError:
+        raise ValueError("Unknown eviction policy: %r." % (policy, ))
+
+    _segment_cache = factory(maxsize)
+
+def segment_cache_info():
+    """Return statistics for the :func:`quote_path_segment` cache."""
 
-_segment_cache = {}
+    return _segment_cache.info()
 
 def quote_path_segment(segment):
     """ Return a quoted representation of a 'path segment' (such as
@@ -66,30 +175,27 @@ def quote_path_segment(segment):
     never Unicode.
 
     .. note:: The return value for each segment passed to this
-              function is cached in a module-scope dictionary for
-              speed: the cached version is returned when possible
-              rather than recomputing the quoted version.  No cache
-              emptying is ever done for the lifetime of an
-              application, however.  If you pass arbitrary
-              user-supplied strings to this function (as opposed to
-              some bounded set of values from a 'working set' known to
-              your application), it may become a memory leak.
+              function is cached in a module-scope cache for speed:
+              the cached version is returned when possible rather
+              than recomputing the quoted version. The cache is
+              bounded (see :func:`set_segment_cache`) such that
+              arbitrary user-supplied strings do not cause it to grow
+              without limit.
     """
     # The bit of this code that deals with ``_segment_cache`` is an
-    # optimization: we cache all the computation of URL path segments
-    # in this module-scope dictionary with the original string (or
-    # unicode value) as the key, so we can look it up later without
-    # needing to reencode or re-url-quote it
+    # optimization: we cache the computation of URL path segments
+    # with the original string (or unicode value) as the key, so we
+    # can look it up later without needing to reencode or re-url-quote
+    # it
+    cache = _segment_cache
     try:
-        return _segment_cache[segment]
+        return cache[segment]
     except KeyError:
         if segment.__class__ is unicode: # isinstance slighly slower (~15%)
             result = url_quote(segment.encode('utf-8'))
         else:
             result = url_quote(segment)
-        # we don't need a lock to mutate _segment_cache, as the below
-        # will generate exactly one Python bytecode (STORE_SUBSCR)
-        _segment_cache[segment] = result
+        cache[segment] = result
         return result
 
 try: